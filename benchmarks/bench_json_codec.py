@@ -0,0 +1,81 @@
+"""Benchmark the JSON codecs used on the Home Assistant websocket.
+
+Compare encoding of a large import_statistics message and decoding of a 10-year statistics_during_period
+response with each available codec.
+
+Usage: python -m benchmarks.bench_json_codec
+"""
+
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from gazpar2haws.json_codec import JsonCodec, OrjsonCodec, orjson
+
+DAYS = 3650
+REPEAT = 20
+
+
+# ----------------------------------
+def build_import_message() -> dict:
+
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    totals = np.cumsum(np.random.default_rng(0).uniform(0, 50, DAYS))
+
+    statistics = [
+        {"start": (start + timedelta(days=i)).isoformat(), "state": total, "sum": total}
+        for i, total in enumerate(totals)
+    ]
+
+    return {
+        "id": 1,
+        "type": "recorder/import_statistics",
+        "metadata": {"has_sum": True, "statistic_id": "sensor.gazpar2haws_energy", "source": "recorder"},
+        "stats": statistics,
+    }
+
+
+# ----------------------------------
+def build_statistics_response() -> bytes:
+
+    start_ms = 1420070400000
+    rows = [
+        {
+            "start": start_ms + i * 86400000,
+            "end": start_ms + (i + 1) * 86400000,
+            "state": 12.5 * i,
+            "sum": 12.5 * i,
+            "change": 12.5,
+        }
+        for i in range(DAYS)
+    ]
+
+    return json.dumps({"id": 1, "type": "result", "success": True, "result": {"sensor.x": rows}}).encode()
+
+
+# ----------------------------------
+def main():
+
+    import_message = build_import_message()
+    statistics_response = build_statistics_response()
+
+    codecs: list[JsonCodec] = [JsonCodec()]
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    else:
+        print("orjson is not installed: only the json codec is benchmarked (pip install gazpar2haws[orjson]).")
+
+    print(f"{DAYS} daily rows, best of {REPEAT} runs")
+    print(f"{'codec':<8} {'encode (ms)':>12} {'decode (ms)':>12}")
+
+    for codec in codecs:
+        encode_time = min(timeit.repeat(lambda c=codec: c.dumps(import_message), number=1, repeat=REPEAT))
+        decode_time = min(timeit.repeat(lambda c=codec: c.loads(statistics_response), number=1, repeat=REPEAT))
+        print(f"{codec.name:<8} {encode_time * 1000:>12.2f} {decode_time * 1000:>12.2f}")
+
+
+# ----------------------------------
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,22 @@
 import asyncio
 import logging
 import signal
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Awaitable
 
 from gazpar2haws.configuration import Configuration
-from gazpar2haws.gazpar import Gazpar
-from gazpar2haws.haws import HomeAssistantWS
+from gazpar2haws.gazpar import Gazpar, GazparReadings, SensorPublication
+from gazpar2haws.haws import HomeAssistantWS, HomeAssistantWSException
+from gazpar2haws.pipeline import Pipeline, PipelineStage
+from gazpar2haws.scheduler import ScanScheduler, parse_scan_window
 
 Logger = logging.getLogger(__name__)
 
+# Maximum time (in seconds) to wait for the statistics imports in progress when shutting down
+IMPORT_FLUSH_TIMEOUT = 30.0
+
 
 # ----------------------------------
 class Bridge:
@@ -18,6 +27,9 @@ class Bridge:
         # GrDF scan interval (in seconds)
         self._grdf_scan_interval = config.grdf.scan_interval
 
+        # GrDF maximum number of devices published at the same time
+        self._grdf_max_concurrent_devices = config.grdf.max_concurrent_devices
+
         # Home Assistant configuration: host
         ha_host = config.homeassistant.host
 
@@ -31,71 +43,315 @@ class Bridge:
         ha_token = config.homeassistant.token.get_secret_value()
 
         # Initialize Home Assistant
-        self._homeassistant = HomeAssistantWS(ha_host, ha_port, ha_endpoint, ha_token)
+        self._homeassistant = HomeAssistantWS(
+            ha_host,
+            ha_port,
+            ha_endpoint,
+            ha_token,
+            reconnect_max_attempts=config.homeassistant.reconnect_max_attempts,
+            reconnect_delay=config.homeassistant.reconnect_delay,
+            reconnect_max_delay=config.homeassistant.reconnect_max_delay,
+            statistic_ids_ttl=config.homeassistant.statistic_ids_ttl,
+            json_codec=config.homeassistant.json_codec,
+            outbox_file=config.homeassistant.outbox_file,
+        )
+
+        # Worker threads running the blocking GrDF fetches (one per device published at the same time)
+        self._grdf_executor = ThreadPoolExecutor(
+            max_workers=self._grdf_max_concurrent_devices, thread_name_prefix="gazpar2haws-grdf"
+        )
 
         # Initialize Gazpar
         self._gazpar = []
 
         for grdf_device_config in config.grdf.devices:
-            self._gazpar.append(Gazpar(grdf_device_config, config.pricing, self._homeassistant))
+            self._gazpar.append(Gazpar(grdf_device_config, config.pricing, self._homeassistant, self._grdf_executor))
+
+        # Publication pipeline: the GrDF download of a device overlaps the statistics import of another one,
+        # and the imports of several devices share the multiplexed Home Assistant connection
+        self._pipeline = Pipeline(
+            [
+                PipelineStage("fetch", self._fetch_device, workers=self._grdf_max_concurrent_devices),
+                PipelineStage("transform", self._transform_device),
+                PipelineStage("publish", self._publish_device, workers=self._grdf_max_concurrent_devices),
+            ]
+        )
+
+        # Scan schedule of the devices (scan windows do not apply to a single scan at startup)
+        self._scheduler = ScanScheduler(
+            interval=timedelta(minutes=self._grdf_scan_interval or 0),
+            max_interval=timedelta(minutes=config.grdf.scan_max_interval),
+            jitter=timedelta(minutes=config.grdf.scan_jitter),
+            windows=(
+                [parse_scan_window(scan_window) for scan_window in config.grdf.scan_windows]
+                if self._grdf_scan_interval
+                else []
+            ),
+        )
 
-        # Set up signal handler
-        signal.signal(signal.SIGINT, self.handle_signal)
-        signal.signal(signal.SIGTERM, self.handle_signal)
+        # Shutdown request: the scan in progress is cancelled and the main loop leaves
+        self._shutdown_event = asyncio.Event()
+
+        # Wake-up of the main loop waiting for the next scan (shutdown or scan request)
+        self._wakeup_event = asyncio.Event()
+        self._scan_requested = False
+
+        # Statistics imports in progress, completed before disconnecting on shutdown
+        self._pending_imports = set[asyncio.Task]()
 
         # Initialize running flag
         self._running = False
 
     # ----------------------------------
     # Graceful shutdown function
-    def handle_signal(self, signum, _):
+    def handle_signal(self, signum, _=None):
         print(f"Signal {signum} received. Shutting down gracefully...")
         Logger.info(f"Signal {signum} received. Shutting down gracefully...")
+        self.request_shutdown()
+
+    # ----------------------------------
+    # Scan request signal (SIGUSR1): scan all the devices now
+    def handle_scan_signal(self, signum, _=None):
+        Logger.info(f"Signal {signum} received. Scanning all the devices now...")
+        self.request_scan()
+
+    # ----------------------------------
+    # Stop the bridge: the waiting main loop wakes up immediately and the scan in progress is cancelled.
+    def request_shutdown(self):
         self._running = False
+        self._shutdown_event.set()
+        self._wakeup_event.set()
+
+    # ----------------------------------
+    # Scan all the devices now, without waiting for their scheduled time.
+    def request_scan(self):
+        self._scan_requested = True
+        self._wakeup_event.set()
 
     # ----------------------------------
     async def run(self):
 
         # Set running flag
         self._running = True
+        self._shutdown_event.clear()
+
+        # Signals are handled by the event loop, so that they are processed immediately
+        self._install_signal_handlers()
+
+        # All the devices are scanned at startup
+        start_time = self._now()
+        for gazpar in self._gazpar:
+            self._scheduler.schedule(gazpar.name(), start_time)
 
         try:
             while self._running:
 
-                # Connect to Home Assistant
-                await self._homeassistant.connect()
+                # A scan request makes all the devices due
+                if self._scan_requested:
+                    self._scan_requested = False
+                    self._scheduler.advance_all(self._now())
 
-                # Publish Gazpar data to Home Assistant WS
-                Logger.info("Publishing Gazpar data to Home Assistant WS...")
+                # Wait for the next scheduled scan (the wait is interrupted by a shutdown or scan request)
+                next_run_time = self._scheduler.next_run_time()
+                if next_run_time is None:
+                    break
 
-                for gazpar in self._gazpar:
-                    Logger.info(f"Publishing data for device '{gazpar.name()}'...")
-                    await gazpar.publish()
-                    Logger.info(f"Device '{gazpar.name()}' data published to Home Assistant WS.")
+                wait_time = (next_run_time - self._now()).total_seconds()
+                if wait_time > 0:
+                    Logger.info(f"Waiting until {next_run_time:%Y-%m-%d %H:%M:%S} before next scan...")
+                    await self._wait_for_wakeup(wait_time)
+                    continue
 
-                Logger.info("Gazpar data published to Home Assistant WS.")
+                due_names = self._scheduler.pop_due(self._now())
+                due_gazpar = [gazpar for gazpar in self._gazpar if gazpar.name() in due_names]
 
-                # Disconnect from Home Assistant
-                await self._homeassistant.disconnect()
+                # Scan the due devices (the scan is cancelled if a shutdown is requested meanwhile)
+                results = await self._run_until_shutdown(self._scan(due_gazpar))
+                if results is None:
+                    break
 
-                # Wait before next scan
-                Logger.info(f"Waiting {self._grdf_scan_interval} minutes before next scan...")
+                self._log_scan_results(due_gazpar, results)
 
                 # Check if the scan interval is 0 and leave the loop.
                 if self._grdf_scan_interval == 0:
                     break
 
-                await self._await_with_interrupt(self._grdf_scan_interval * 60, 5)
+                # Schedule the next scan of each device: sooner if new data has been published, later if not
+                end_time = self._now()
+                for gazpar, result in zip(due_gazpar, results):
+                    next_run_time = self._scheduler.reschedule(
+                        gazpar.name(),
+                        end_time,
+                        None if isinstance(result, Exception) else result,
+                        gazpar.next_publication_time(),
+                    )
+                    Logger.info(f"Next scan of device '{gazpar.name()}' at {next_run_time:%Y-%m-%d %H:%M:%S}")
         except KeyboardInterrupt:
             print("Keyboard interrupt detected. Shutting down gracefully...")
             Logger.info("Keyboard interrupt detected. Shutting down gracefully...")
+        finally:
+            self._remove_signal_handlers()
+
+            # Let the statistics imports already started complete
+            await self._flush_pending_imports()
+
+            # Disconnect from Home Assistant
+            if self._homeassistant.is_connected():
+                await self._homeassistant.disconnect()
+
+            # Do not wait for a GrDF fetch still running (e.g. after a timeout)
+            self._grdf_executor.shutdown(wait=False, cancel_futures=True)
+
+    # ----------------------------------
+    # Scan the given devices and return the result of each one (or the exception raised for it).
+    # If Home Assistant cannot be reached, the connection error is the result of all the devices: they are
+    # scanned again later instead of stopping the bridge (e.g. during a long Home Assistant restart).
+    async def _scan(self, due_gazpar: list[Gazpar]) -> list:
+
+        # Connect to Home Assistant (the connection is kept open across scans and re-established if lost)
+        try:
+            await self._homeassistant.ensure_connected()
+        except HomeAssistantWSException as exc:
+            Logger.warning(
+                f"Home Assistant is not reachable, the scan of {len(due_gazpar)} device(s) is postponed: {exc}"
+            )
+            return [exc for _ in due_gazpar]
+
+        # Statistic ids are listed again once per scan (they may have been changed outside Gazpar2HAWS)
+        self._homeassistant.invalidate_statistic_ids()
+
+        # Publish Gazpar data to Home Assistant WS
+        Logger.info("Publishing Gazpar data to Home Assistant WS...")
+
+        # Devices go through the fetch, transform and publish stages concurrently (an error on a device
+        # is logged and does not interrupt the others)
+        return await self._pipeline.run(due_gazpar)
+
+    # ----------------------------------
+    # Log the errors of the devices, the number of devices succeeded and the activity of the pipeline stages.
+    def _log_scan_results(self, due_gazpar: list[Gazpar], results: list):
+
+        for gazpar, result in zip(due_gazpar, results):
+            if isinstance(result, Exception):
+                Logger.error(
+                    f"Error while publishing data for device '{gazpar.name()}': "
+                    f"{''.join(traceback.format_exception(result))}"
+                )
+
+        succeeded_count = sum(1 for result in results if not isinstance(result, Exception))
+        Logger.info(f"Gazpar data published to Home Assistant WS ({succeeded_count}/{len(results)} devices succeeded).")
+
+        for stage_stats in self._pipeline.stats():
+            Logger.info(f"Pipeline stage {stage_stats}")
+
+    # ----------------------------------
+    # Run a coroutine until it completes or a shutdown is requested. Return its result, or None if it has been
+    # cancelled by the shutdown.
+    async def _run_until_shutdown(self, coroutine: Awaitable[Any]) -> Any:
+
+        task = asyncio.ensure_future(coroutine)
+        shutdown_task = asyncio.ensure_future(self._shutdown_event.wait())
+
+        try:
+            await asyncio.wait([task, shutdown_task], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            shutdown_task.cancel()
+            if not task.done():
+                Logger.info("Cancelling the scan in progress...")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        if task.cancelled():
+            return None
+
+        return task.result()
+
+    # ----------------------------------
+    # Wait until the given time (in seconds) has elapsed or the main loop is woken up.
+    async def _wait_for_wakeup(self, timeout: float):
+
+        try:
+            await asyncio.wait_for(self._wakeup_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        self._wakeup_event.clear()
+
+    # ----------------------------------
+    def _install_signal_handlers(self):
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.handle_signal, signal.SIGINT)
+            loop.add_signal_handler(signal.SIGTERM, self.handle_signal, signal.SIGTERM)
+            if hasattr(signal, "SIGUSR1"):
+                loop.add_signal_handler(signal.SIGUSR1, self.handle_scan_signal, signal.SIGUSR1)
+        except (NotImplementedError, ValueError):
+            # No event loop signal handlers (e.g. on Windows): the handler is scheduled on the loop by the signal
+            signal.signal(signal.SIGINT, lambda signum, _: loop.call_soon_threadsafe(self.handle_signal, signum))
+            signal.signal(signal.SIGTERM, lambda signum, _: loop.call_soon_threadsafe(self.handle_signal, signum))
+
+    # ----------------------------------
+    def _remove_signal_handlers(self):
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+            loop.remove_signal_handler(signal.SIGTERM)
+            if hasattr(signal, "SIGUSR1"):
+                loop.remove_signal_handler(signal.SIGUSR1)
+        except (NotImplementedError, ValueError):
+            pass
+
+    # ----------------------------------
+    # Wait for the statistics imports in progress (they are not interrupted by the cancellation of a scan).
+    async def _flush_pending_imports(self):
+
+        if len(self._pending_imports) == 0:
+            return
+
+        Logger.info(f"Waiting for {len(self._pending_imports)} statistics import(s) in progress...")
+
+        _, pending = await asyncio.wait(self._pending_imports, timeout=IMPORT_FLUSH_TIMEOUT)
+        if len(pending) > 0:
+            Logger.warning(f"{len(pending)} statistics import(s) not completed after {IMPORT_FLUSH_TIMEOUT} seconds")
+
+    # ----------------------------------
+    async def _fetch_device(self, gazpar: Gazpar) -> tuple[Gazpar, GazparReadings]:
+
+        Logger.info(f"Fetching data for device '{gazpar.name()}'...")
+
+        return gazpar, await gazpar.fetch()
+
+    # ----------------------------------
+    async def _transform_device(self, item: tuple[Gazpar, GazparReadings]) -> tuple[Gazpar, list[SensorPublication]]:
+
+        gazpar, readings = item
+
+        return gazpar, gazpar.transform(readings)
+
+    # ----------------------------------
+    # Return True if new data has been published.
+    async def _publish_device(self, item: tuple[Gazpar, list[SensorPublication]]) -> bool:
+
+        gazpar, publications = item
+
+        Logger.info(f"Publishing data for device '{gazpar.name()}'...")
+
+        # The import goes on if the scan is cancelled, so that the statistics of a device are not left half imported
+        import_task = asyncio.create_task(gazpar.publish_statistics(publications))
+        self._pending_imports.add(import_task)
+        import_task.add_done_callback(self._pending_imports.discard)
+
+        published = await asyncio.shield(import_task)
+        Logger.info(f"Device '{gazpar.name()}' data published to Home Assistant WS.")
+
+        return published
 
     # ----------------------------------
-    async def _await_with_interrupt(self, total_sleep_time: int, check_interval: int):
-        elapsed_time = 0
-        while elapsed_time < total_sleep_time:
-            await asyncio.sleep(check_interval)
-            elapsed_time += check_interval
-            # Check if an interrupt signal or external event requires breaking
-            if not self._running:  # Assuming `running` is a global flag
-                break
+    # Current local time (with timezone information).
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now().astimezone()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Optional
+
+import numpy as np
+import pygazpar  # type: ignore
+from pygazpar.datasource import MeterReadings  # type: ignore
+
+from gazpar2haws.date_array import DateArray
+
+
+# ----------------------------------
+class DailyReadings:
+    """
+    Columnar view of GrDF daily meter readings.
+
+    The readings are parsed once: dates become a sorted datetime64[D] array and each property a float array
+    aligned with it, with a mask telling which values are present (missing values are NaN).
+    All the later extractions are then vectorized indexing, without parsing rows again.
+    """
+
+    # ----------------------------------
+    def __init__(self, dates: np.ndarray, values: dict[str, np.ndarray], masks: dict[str, np.ndarray]):
+        self.dates = dates
+        self.values = values
+        self.masks = masks
+
+    # ----------------------------------
+    @staticmethod
+    def empty(property_names: list[str]) -> DailyReadings:
+
+        return DailyReadings(
+            np.empty(0, dtype="datetime64[D]"),
+            {property_name: np.empty(0) for property_name in property_names},
+            {property_name: np.empty(0, dtype=bool) for property_name in property_names},
+        )
+
+    # ----------------------------------
+    # Parse the pygazpar readings (time period formatted as DD/MM/YYYY) and keep the given properties.
+    @staticmethod
+    def from_meter_readings(readings: MeterReadings, property_names: list[str]) -> DailyReadings:
+
+        time_period_name = pygazpar.PropertyName.TIME_PERIOD.value
+
+        # DD/MM/YYYY -> YYYY-MM-DD, which numpy parses natively
+        dates = np.array(
+            [
+                f"{time_period[6:10]}-{time_period[3:5]}-{time_period[0:2]}"
+                for time_period in (reading[time_period_name] for reading in readings)
+            ],
+            dtype="datetime64[D]",
+        )
+
+        values = dict[str, np.ndarray]()
+        for property_name in property_names:
+            values[property_name] = np.array([reading.get(property_name) for reading in readings], dtype=float)
+
+        # Readings are sorted by date (stable, so that the last reading of a duplicate date wins as before)
+        order = np.argsort(dates, kind="stable")
+        dates = dates[order]
+        values = {property_name: array[order] for property_name, array in values.items()}
+        masks = {property_name: ~np.isnan(array) for property_name, array in values.items()}
+
+        return DailyReadings(dates, values, masks)
+
+    # ----------------------------------
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    # ----------------------------------
+    def first_date(self) -> dt.date:
+        return self.dates[0].astype(dt.date)
+
+    # ----------------------------------
+    def last_date(self) -> dt.date:
+        return self.dates[-1].astype(dt.date)
+
+    # ----------------------------------
+    # Keep the readings between start_date and end_date (inclusive).
+    def between(self, start_date: dt.date, end_date: dt.date) -> DailyReadings:
+
+        selection = (self.dates >= np.datetime64(start_date, "D")) & (self.dates <= np.datetime64(end_date, "D"))
+
+        return DailyReadings(
+            self.dates[selection],
+            {property_name: array[selection] for property_name, array in self.values.items()},
+            {property_name: mask[selection] for property_name, mask in self.masks.items()},
+        )
+
+    # ----------------------------------
+    # Tell whether the property has at least one value between start_date and end_date (inclusive).
+    def has_values(self, property_name: str, start_date: dt.date, end_date: dt.date) -> bool:
+
+        selection = (self.dates >= np.datetime64(start_date, "D")) & (self.dates <= np.datetime64(end_date, "D"))
+
+        return bool(np.any(self.masks[property_name][selection]))
+
+    # ----------------------------------
+    # Return the values of a property between start_date and end_date as a DateArray (days without a value are 0),
+    # or None if the property has no value in this range.
+    def to_date_array(self, property_name: str, start_date: dt.date, end_date: dt.date) -> Optional[DateArray]:
+
+        date_arrays, _ = self.to_date_arrays([property_name], start_date, end_date)
+
+        return date_arrays[property_name]
+
+    # ----------------------------------
+    # Return the values of several properties between start_date and end_date as DateArrays sharing the same date
+    # axis (days without a value are 0, None for a property without any value in this range), filled with a
+    # single scatter of all the properties at once, and the mask of the days without any reading.
+    def to_date_arrays(
+        self, property_names: list[str], start_date: dt.date, end_date: dt.date
+    ) -> tuple[dict[str, Optional[DateArray]], np.ndarray]:
+
+        length = max((end_date - start_date).days + 1, 0)
+
+        offsets = (self.dates - np.datetime64(start_date, "D")).astype(int)
+        in_range = (offsets >= 0) & (offsets < length)
+        positions = offsets[in_range]
+
+        # One row per property: the readings in range are scattered to their day offset in one pass.
+        values = np.zeros((len(property_names), length))
+        present = np.zeros((len(property_names), length), dtype=bool)
+        if len(property_names) > 0:
+            values[:, positions] = np.nan_to_num(np.stack([self.values[name][in_range] for name in property_names]))
+            present[:, positions] = np.stack([self.masks[name][in_range] for name in property_names])
+
+        has_reading = np.zeros(length, dtype=bool)
+        has_reading[positions] = True
+
+        date_arrays = dict[str, Optional[DateArray]]()
+        for index, property_name in enumerate(property_names):
+            if np.any(present[index]):
+                date_arrays[property_name] = DateArray(
+                    name=property_name, start_date=start_date, end_date=end_date, array=values[index]
+                )
+            else:
+                date_arrays[property_name] = None
+
+        return date_arrays, ~has_reading
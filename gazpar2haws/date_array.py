@@ -2,29 +2,93 @@ from __future__ import annotations
 
 import datetime as dt
 from datetime import timedelta
-from typing import Optional, overload
+from typing import Any, Callable, Iterator, Optional, Sequence, overload
 
 import numpy as np
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
 
 
-class DateArray(BaseModel):  # pylint: disable=too-few-public-methods
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+# ----------------------------------
+# Dates from start_date to end_date (inclusive) as a numpy datetime64[D] array.
+def date_range(start_date: dt.date, end_date: dt.date) -> np.ndarray:
 
-    name: Optional[str] = None
+    return np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+
+
+# ----------------------------------
+class DateArray:
+    """
+    Array of daily values between start_date and end_date (inclusive).
+
+    It is a plain slotted class: the arithmetic operators build their result directly from the computed array,
+    without model construction nor validation. Validation only happens at the boundaries, when a DateArray is
+    used as a field of a pydantic model.
+    """
+
+    __slots__ = ("name", "start_date", "end_date", "array", "initial_value")
+
+    name: Optional[str]
     start_date: dt.date
     end_date: dt.date
-    array: Optional[np.ndarray] = None
-    initial_value: Optional[float] = None
+    array: Optional[np.ndarray]
+    initial_value: Optional[float]
+
+    def __init__(
+        self,
+        *,
+        start_date: dt.date,
+        end_date: dt.date,
+        name: Optional[str] = None,
+        array: Optional[np.ndarray] = None,
+        initial_value: Optional[float] = None,
+    ):
+        self.name = name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.initial_value = float(initial_value) if initial_value is not None else None
+
+        if array is not None:
+            self.array = array
+        elif self.initial_value is not None:
+            self.array = np.full((end_date - start_date).days + 1, self.initial_value)
+        else:
+            self.array = np.zeros((end_date - start_date).days + 1)
 
-    @model_validator(mode="after")
-    def set_array(self):
-        if self.array is None:
-            if self.initial_value is not None:
-                self.array = np.full((self.end_date - self.start_date).days + 1, self.initial_value)
-            else:
-                self.array = np.zeros((self.end_date - self.start_date).days + 1)
-        return self
+    # ----------------------------------
+    # Pydantic support: a DateArray field accepts a DateArray (kept as is) or a dict of its constructor arguments.
+    @classmethod
+    def __get_pydantic_core_schema__(cls, _source_type: Any, _handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(cls._validate)
+
+    # ----------------------------------
+    @classmethod
+    def _validate(cls, value: Any) -> DateArray:
+
+        if isinstance(value, DateArray):
+            return value
+        if isinstance(value, dict):
+            return cls(**value)
+
+        raise ValueError(f"Expected a DateArray, got {type(value).__name__}")
+
+    # ----------------------------------
+    # Build a date array with the same dates from an already computed array (no allocation).
+    def _with_array(self, array: np.ndarray, name: Optional[str] = None) -> DateArray:
+        return DateArray(
+            name=self.name if name is None else name, start_date=self.start_date, end_date=self.end_date, array=array
+        )
+
+    # ----------------------------------
+    def copy(self) -> DateArray:
+
+        return DateArray(
+            name=self.name,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            array=self.array.copy() if self.array is not None else None,
+            initial_value=self.initial_value,
+        )
 
     # ----------------------------------
     def get(self, date: dt.date) -> float:
@@ -34,22 +98,47 @@ class DateArray(BaseModel):  # pylint: disable=too-few-public-methods
 
         return self.array[(date - self.start_date).days]
 
+    # ----------------------------------
+    # Array indices of the given dates (a sequence of dates or a datetime64 array), computed in one numpy operation.
+    def indices_of(self, dates: Sequence[dt.date] | np.ndarray) -> np.ndarray:
+
+        indices = (np.asarray(dates, dtype="datetime64[D]") - np.datetime64(self.start_date, "D")).astype(np.int64)
+
+        if indices.size > 0 and (indices.min() < 0 or indices.max() >= len(self)):
+            raise ValueError(f"Dates are out of range [{self.start_date}:{self.end_date}]")
+
+        return indices
+
+    # ----------------------------------
+    # Gather the values of the given dates.
+    def get_many(self, dates: Sequence[dt.date] | np.ndarray) -> np.ndarray:
+
+        if self.array is None:
+            raise ValueError("Array is not initialized")
+
+        return self.array[self.indices_of(dates)]
+
+    # ----------------------------------
+    # Scatter values (a number or an array with one value per date) to the given dates.
+    def set_many(self, dates: Sequence[dt.date] | np.ndarray, values: np.ndarray | float) -> None:
+
+        if self.array is None:
+            raise ValueError("Array is not initialized")
+
+        self.array[self.indices_of(dates)] = values
+
     # ----------------------------------
     def cumsum(self) -> DateArray:
 
         if self.array is None:
             raise ValueError("Array is not initialized")
 
-        result = DateArray(name=f"cumsum_{self.name}", start_date=self.start_date, end_date=self.end_date)
-        result.array = np.cumsum(self.array)
-        return result
+        return self._with_array(np.cumsum(self.array), name=f"cumsum_{self.name}")
 
     # ----------------------------------
     def is_aligned_with(self, other: DateArray) -> bool:
 
-        return (
-            self.start_date == other.start_date and self.end_date == other.end_date and len(self) == len(other)
-        )  # pylint: disable=protected-access
+        return self.start_date == other.start_date and self.end_date == other.end_date and len(self) == len(other)
 
     # ----------------------------------
     @overload
@@ -132,99 +221,134 @@ class DateArray(BaseModel):  # pylint: disable=too-few-public-methods
         return len(self.array)
 
     # ----------------------------------
-    def __iter__(self):
-        self._index = 0  # pylint: disable=attribute-defined-outside-init
-        return self
+    # Iterate over the (date, value) pairs. Each iteration has its own cursor, so nested iterations are safe.
+    def __iter__(self) -> Iterator[tuple[dt.date, float]]:
+
+        if self.array is None:
+            raise ValueError("Array is not initialized")
+
+        return zip(self.dates().tolist(), self.array.tolist())
 
     # ----------------------------------
-    def __next__(self):
-        if self._index < len(self.array):
-            current_date = self.start_date + dt.timedelta(days=self._index)
-            result = (current_date, self.array[self._index])
-            self._index += 1
-            return result
-        raise StopIteration
+    # Date axis as a numpy datetime64[D] array.
+    def dates(self) -> np.ndarray:
+
+        return np.datetime64(self.start_date, "D") + np.arange(len(self))
 
     # ----------------------------------
-    @overload
-    def __add__(self, other: DateArray) -> DateArray: ...
+    # (date, value) pairs as a numpy structured array with the fields "date" (datetime64[D]) and "value".
+    def to_records(self) -> np.ndarray:
 
-    @overload
-    def __add__(self, other: float) -> DateArray: ...
+        records = np.empty(len(self), dtype=[("date", "datetime64[D]"), ("value", float)])
+        records["date"] = self.dates()
+        records["value"] = self.array
 
-    def __add__(self, other) -> DateArray:
+        return records
+
+    # ----------------------------------
+    # Consecutive date arrays of at most size days, which are views of this one (no copy).
+    def chunks(self, size: int) -> Iterator[DateArray]:
 
         if self.array is None:
             raise ValueError("Array is not initialized")
 
-        if isinstance(other, (int, float)):
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array + other
-            return result
-        if isinstance(other, DateArray):
-            if other.array is None:
-                raise ValueError("Array is not initialized")
-            if not self.is_aligned_with(other):
-                raise ValueError(f"Date arrays {self} and {other} are not aligned")
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array + other.array  # pylint: disable=protected-access
-            return result
+        if size < 1:
+            raise ValueError(f"Invalid chunk size {size} (expected value >= 1)")
 
-        raise TypeError("Other must be a date array or a number")
+        for start_index in range(0, len(self.array), size):
+            end_index = min(start_index + size, len(self.array))
+            yield DateArray(
+                name=self.name,
+                start_date=self.start_date + timedelta(days=start_index),
+                end_date=self.start_date + timedelta(days=end_index - 1),
+                array=self.array[start_index:end_index],
+            )
 
     # ----------------------------------
-    @overload
-    def __sub__(self, other: DateArray) -> DateArray: ...
+    # Apply a numpy binary operator element-wise with a number or an aligned date array.
+    def _apply(self, operator: Callable[[np.ndarray, Any], np.ndarray], other: Any) -> DateArray:
 
-    @overload
-    def __sub__(self, other: float) -> DateArray: ...
+        if self.array is None:
+            raise ValueError("Array is not initialized")
 
-    def __sub__(self, other) -> DateArray:
+        return self._with_array(operator(self.array, self._operand(other)))
+
+    # ----------------------------------
+    # Apply a numpy binary operator element-wise with a number or an aligned date array, in place.
+    def _apply_in_place(self, operator: Callable[..., np.ndarray], other: Any) -> DateArray:
 
         if self.array is None:
             raise ValueError("Array is not initialized")
 
+        operator(self.array, self._operand(other), out=self.array)
+
+        return self
+
+    # ----------------------------------
+    # Return the numpy operand of a number or an aligned date array.
+    def _operand(self, other: Any) -> Any:
+
         if isinstance(other, (int, float)):
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array - other
-            return result
+            return other
         if isinstance(other, DateArray):
             if other.array is None:
                 raise ValueError("Array is not initialized")
             if not self.is_aligned_with(other):
                 raise ValueError(f"Date arrays {self} and {other} are not aligned")
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array - other.array  # pylint: disable=protected-access
-            return result
+            return other.array
 
         raise TypeError("Other must be a date array or a number")
 
+    # ----------------------------------
+    # Compute self * factor + addend in one pass over a single buffer: the result is written into out (an aligned
+    # date array, which may be self) if given, into a new date array otherwise.
+    def multiply_add(
+        self, factor: DateArray | float, addend: DateArray | float, out: Optional[DateArray] = None
+    ) -> DateArray:
+
+        if self.array is None:
+            raise ValueError("Array is not initialized")
+
+        if out is None:
+            out = self._with_array(np.empty_like(self.array, dtype=float))
+        elif out.array is None or not self.is_aligned_with(out):
+            raise ValueError(f"Output date array {out} is not aligned with {self}")
+
+        out_array: np.ndarray = out.array  # type: ignore[assignment]
+        np.multiply(self.array, self._operand(factor), out=out_array)
+        np.add(out_array, self._operand(addend), out=out_array)
+
+        return out
+
     # ----------------------------------
     @overload
-    def __mul__(self, other: DateArray) -> DateArray: ...
+    def __add__(self, other: DateArray) -> DateArray: ...
 
     @overload
-    def __mul__(self, other: float) -> DateArray: ...
+    def __add__(self, other: float) -> DateArray: ...
 
-    def __mul__(self, other) -> DateArray:
+    def __add__(self, other) -> DateArray:
+        return self._apply(np.add, other)
 
-        if self.array is None:
-            raise ValueError("Array is not initialized")
+    # ----------------------------------
+    @overload
+    def __sub__(self, other: DateArray) -> DateArray: ...
 
-        if isinstance(other, (int, float)):
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array * other
-            return result
-        if isinstance(other, DateArray):
-            if other.array is None:
-                raise ValueError("Array is not initialized")
-            if not self.is_aligned_with(other):
-                raise ValueError(f"Date arrays {self} and {other} are not aligned")
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array * other.array  # pylint: disable=protected-access
-            return result
+    @overload
+    def __sub__(self, other: float) -> DateArray: ...
 
-        raise TypeError("Other must be a date array or a number")
+    def __sub__(self, other) -> DateArray:
+        return self._apply(np.subtract, other)
+
+    # ----------------------------------
+    @overload
+    def __mul__(self, other: DateArray) -> DateArray: ...
+
+    @overload
+    def __mul__(self, other: float) -> DateArray: ...
+
+    def __mul__(self, other) -> DateArray:
+        return self._apply(np.multiply, other)
 
     # ----------------------------------
     @overload
@@ -234,24 +358,27 @@ class DateArray(BaseModel):  # pylint: disable=too-few-public-methods
     def __truediv__(self, other: float) -> DateArray: ...
 
     def __truediv__(self, other) -> DateArray:
+        return self._apply(np.true_divide, other)
 
-        if self.array is None:
-            raise ValueError("Array is not initialized")
+    # ----------------------------------
+    def __iadd__(self, other: DateArray | float) -> DateArray:  # type: ignore[misc]
+        return self._apply_in_place(np.add, other)
 
-        if isinstance(other, (int, float)):
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array / other
-            return result
-        if isinstance(other, DateArray):
-            if other.array is None:
-                raise ValueError("Array is not initialized")
-            if not self.is_aligned_with(other):
-                raise ValueError(f"Date arrays {self} and {other} are not aligned")
-            result = DateArray(name=self.name, start_date=self.start_date, end_date=self.end_date)
-            result.array = self.array / other.array  # pylint: disable=protected-access
-            return result
+    # ----------------------------------
+    def __isub__(self, other: DateArray | float) -> DateArray:  # type: ignore[misc]
+        return self._apply_in_place(np.subtract, other)
 
-        raise TypeError("Other must be a date array or a number")
+    # ----------------------------------
+    def __imul__(self, other: DateArray | float) -> DateArray:  # type: ignore[misc]
+        return self._apply_in_place(np.multiply, other)
+
+    # ----------------------------------
+    def __itruediv__(self, other: DateArray | float) -> DateArray:  # type: ignore[misc]
+        return self._apply_in_place(np.true_divide, other)
+
+    # ----------------------------------
+    def __repr__(self) -> str:
+        return str(self)
 
     # ----------------------------------
     def __str__(self) -> str:
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any, Optional
+
+import numpy as np
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+from gazpar2haws.date_array import DateArray
+
+
+# ----------------------------------
+class DateFrame:
+    """
+    Several named series of daily values between start_date and end_date (inclusive), sharing the same date axis.
+
+    The values are stored in one contiguous matrix with one row per column name, so that all the series can be
+    computed with a single numpy operation. Each column is exposed as a DateArray view of its row (no copy).
+    """
+
+    __slots__ = ("start_date", "end_date", "columns", "matrix", "_column_indexes")
+
+    start_date: dt.date
+    end_date: dt.date
+    columns: list[str]
+    matrix: np.ndarray
+
+    def __init__(
+        self,
+        *,
+        start_date: dt.date,
+        end_date: dt.date,
+        columns: list[str],
+        matrix: Optional[np.ndarray] = None,
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.columns = list(columns)
+
+        # Row of each column name
+        self._column_indexes = {name: index for index, name in enumerate(self.columns)}
+        if len(self._column_indexes) != len(self.columns):
+            duplicates = sorted({name for name in self.columns if self.columns.count(name) > 1})
+            raise ValueError(f"Duplicate column names {duplicates}")
+
+        shape = (len(self.columns), (end_date - start_date).days + 1)
+
+        if matrix is None:
+            self.matrix = np.zeros(shape)
+        elif matrix.shape != shape:
+            raise ValueError(f"Matrix shape {matrix.shape} does not match the date frame shape {shape}")
+        else:
+            self.matrix = matrix
+
+    # ----------------------------------
+    # Pydantic support: a DateFrame field accepts a DateFrame (kept as is) or a dict of its constructor arguments.
+    @classmethod
+    def __get_pydantic_core_schema__(cls, _source_type: Any, _handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(cls._validate)
+
+    # ----------------------------------
+    @classmethod
+    def _validate(cls, value: Any) -> DateFrame:
+
+        if isinstance(value, DateFrame):
+            return value
+        if isinstance(value, dict):
+            return cls(**value)
+
+        raise ValueError(f"Expected a DateFrame, got {type(value).__name__}")
+
+    # ----------------------------------
+    # Row of the given column name in the matrix.
+    def column_index(self, name: str) -> int:
+
+        try:
+            return self._column_indexes[name]
+        except KeyError as exc:
+            raise KeyError(f"Unknown column '{name}' (expected one of {self.columns})") from exc
+
+    # ----------------------------------
+    # Column as a DateArray view of its row: writing into the date array writes into the date frame.
+    def __getitem__(self, name: str) -> DateArray:
+
+        return DateArray(
+            name=name, start_date=self.start_date, end_date=self.end_date, array=self.matrix[self.column_index(name)]
+        )
+
+    # ----------------------------------
+    def __setitem__(self, name: str, value: DateArray | float) -> None:
+
+        if isinstance(value, DateArray):
+            if value.start_date != self.start_date or value.end_date != self.end_date:
+                raise ValueError(f"Date array {value} is not aligned with the date frame")
+            self.matrix[self.column_index(name)] = value.array
+        elif isinstance(value, (int, float)):
+            self.matrix[self.column_index(name)] = value
+        else:
+            raise TypeError("Value must be a float or a DateArray")
+
+    # ----------------------------------
+    def __contains__(self, name: object) -> bool:
+
+        return name in self._column_indexes
+
+    # ----------------------------------
+    # Number of days.
+    def __len__(self) -> int:
+
+        return self.matrix.shape[1]
+
+    # ----------------------------------
+    # Cumulative sum of every column, plus an optional initial value per column, in one operation.
+    def cumsum(self, initial_values: Optional[list[float]] = None) -> DateFrame:
+
+        matrix = np.cumsum(self.matrix, axis=1)
+        if initial_values is not None:
+            matrix += np.asarray(initial_values, dtype=float)[:, np.newaxis]
+
+        return DateFrame(start_date=self.start_date, end_date=self.end_date, columns=self.columns, matrix=matrix)
+
+    # ----------------------------------
+    def __repr__(self) -> str:
+        return str(self)
+
+    # ----------------------------------
+    def __str__(self) -> str:
+
+        return f"DateFrame(start_date={self.start_date}, end_date={self.end_date}, columns={self.columns}, slots={len(self)})"
@@ -2,8 +2,12 @@
 
 from datetime import date, datetime
 
+import numpy as np
 import pytz
 
+# Ordinal (days since 0001-01-01) of the numpy datetime64 epoch (1970-01-01)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
 
 def timestamp_ms_to_datetime(timestamp_ms: int | float | str, timezone: str | None = None) -> datetime:
     """
@@ -102,3 +106,53 @@ def convert_statistics_timestamps(statistics: list[dict], timezone: str | None =
         converted_statistics.append(converted_stat)
 
     return converted_statistics
+
+
+def local_midnight_iso_strings(dates: np.ndarray, timezone: str, max_span_days: int = 7) -> list[str]:
+    """
+    Convert dates to the ISO format strings of their midnight in the given timezone.
+
+    The UTC offset of midnight is only computed (with pytz, which is slow) at the bounds of spans of at most
+    max_span_days, and by bisection inside a span where it changes. A span with the same offset at both bounds
+    is assumed to have it all along, which holds as long as a timezone does not change its offset back and forth
+    within max_span_days.
+
+    Args:
+        dates: Sorted numpy array of datetime64[D] dates
+        timezone: Timezone string of the local midnight
+        max_span_days: Maximum span (in days) of dates sharing the offset of their bounds
+
+    Returns:
+        List of ISO format strings (e.g., "2021-01-01T00:00:00+01:00")
+    """
+    tz = pytz.timezone(timezone)
+    days = dates.astype("datetime64[D]").astype(int).tolist()
+
+    def offset_suffix(index: int) -> str:
+        # isoformat of a local midnight is "YYYY-MM-DDT00:00:00" followed by the UTC offset
+        local_midnight = datetime.combine(date.fromordinal(EPOCH_ORDINAL + days[index]), datetime.min.time())
+        return tz.localize(local_midnight).isoformat()[19:]
+
+    suffixes = [""] * len(days)
+
+    def fill(low: int, high: int, low_suffix: str, high_suffix: str):
+        if low_suffix == high_suffix and days[high] - days[low] <= max_span_days:
+            suffixes[low : high + 1] = [low_suffix] * (high - low + 1)
+        elif high - low <= 1:
+            suffixes[low] = low_suffix
+            suffixes[high] = high_suffix
+        else:
+            middle = (low + high) // 2
+            middle_suffix = offset_suffix(middle)
+            fill(low, middle, low_suffix, middle_suffix)
+            fill(middle, high, middle_suffix, high_suffix)
+
+    # Offsets on a grid of max_span_days, then bisection where they differ.
+    if len(days) > 0:
+        grid = list(range(0, len(days) - 1, max_span_days)) + [len(days) - 1]
+        grid_suffixes = [offset_suffix(index) for index in grid]
+        for low, high, low_suffix, high_suffix in zip(grid, grid[1:], grid_suffixes, grid_suffixes[1:]):
+            fill(low, high, low_suffix, high_suffix)
+        suffixes[grid[-1]] = grid_suffixes[-1]
+
+    return [f"{day}T00:00:00{suffix}" for day, suffix in zip(np.datetime_as_string(dates, unit="D").tolist(), suffixes)]
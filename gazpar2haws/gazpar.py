@@ -1,14 +1,19 @@
+import asyncio
 import logging
 import traceback
+from concurrent.futures import Executor
 from datetime import date, datetime, timedelta
 from typing import Optional
 
+import numpy as np
 import pygazpar  # type: ignore
 import pytz
+from pydantic import BaseModel, ConfigDict
 from pygazpar.datasource import MeterReadings  # type: ignore
 
+from gazpar2haws.daily_readings import DailyReadings
 from gazpar2haws.date_array import DateArray
-from gazpar2haws.datetime_utils import timestamp_ms_to_date
+from gazpar2haws.datetime_utils import local_midnight_iso_strings, timestamp_ms_to_date
 from gazpar2haws.haws import HomeAssistantWS, HomeAssistantWSException
 from gazpar2haws.model import (
     ConsumptionQuantityArray,
@@ -19,9 +24,36 @@ from gazpar2haws.model import (
     TimeUnit,
 )
 from gazpar2haws.pricer import Pricer
+from gazpar2haws.publication_gate import PublicationGate
+from gazpar2haws.readings_cache import ReadingsCache
+from gazpar2haws.statistics_outbox import SensorStatistics
 
 Logger = logging.getLogger(__name__)
 
+# Properties kept from the GrDF daily readings
+READING_PROPERTY_NAMES = [pygazpar.PropertyName.VOLUME.value, pygazpar.PropertyName.ENERGY.value]
+
+
+# ----------------------------------
+# Output of the fetch stage: the last statistics known by Home Assistant and the new GrDF daily readings.
+class GazparReadings(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    end_date: date
+    daily_history: DailyReadings
+    last_date_and_value_by_sensor: dict[str, tuple[date, float]]
+
+
+# ----------------------------------
+# Output of the transform stage: the cumulative sums to publish as statistics of a sensor (they continue from the
+# last sum known by Home Assistant).
+class SensorPublication(BaseModel):
+    entity_id: str
+    entity_name: str
+    unit_class: Optional[str]
+    unit_of_measurement: str
+    sum_array: DateArray
+
 
 # ----------------------------------
 class Gazpar:
@@ -32,9 +64,14 @@ class Gazpar:
         device_config: Device,
         pricing_config: Optional[Pricing],
         homeassistant: HomeAssistantWS,
+        executor: Optional[Executor] = None,
     ):
 
         self._homeassistant = homeassistant
+        # Executor running the blocking GrDF fetches (None: default executor of the event loop)
+        self._executor = executor
+        # Fetches abandoned after a timeout whose worker thread is still running
+        self._abandoned_fetches = set[asyncio.Future]()
         self._grdf_config = device_config
         self._pricing_config = pricing_config
 
@@ -67,12 +104,41 @@ class Gazpar:
         # GrDF configuration: reset
         self._reset = device_config.reset
 
+        # GrDF configuration: repair
+        self._repair = device_config.repair
+
+        # GrDF configuration: fetch_timeout
+        self._fetch_timeout = device_config.fetch_timeout
+
+        # GrDF configuration: readings_cache_file (local cache of the daily readings, None if disabled)
+        self._readings_cache = (
+            ReadingsCache(device_config.readings_cache_file) if device_config.readings_cache_file is not None else None
+        )
+
+        # GrDF configuration: publication_gate (learned publication time of the daily readings, None if disabled)
+        self._publication_gate = PublicationGate() if device_config.publication_gate else None
+
+        # Last daily reading date known after the last fetch (None before the first fetch)
+        self._last_known_date: Optional[date] = None
+
         # As of date: YYYY-MM-DD
         self._as_of_date = device_config.as_of_date
 
         # Set the timezone
         self._timezone = device_config.timezone
 
+        # Volume, energy and cost sensor names.
+        self._volume_sensor_name = f"sensor.{self._name}_volume"
+        self._energy_sensor_name = f"sensor.{self._name}_energy"
+        self._total_cost_sensor_name = f"sensor.{self._name}_total_cost"
+
+        # Generate component cost sensor names dynamically
+        self._component_sensor_names = dict[str, str]()
+        if self._pricing_config is not None:
+            for component_name in self._pricing_config.get_components().keys():
+                sensor_suffix = self._get_legacy_sensor_suffix(component_name)
+                self._component_sensor_names[component_name] = f"sensor.{self._name}_{sensor_suffix}"
+
     # ----------------------------------
     def name(self):
         return self._name
@@ -81,27 +147,36 @@ class Gazpar:
     def as_of_date(self):
         return date.today() if self._as_of_date is None else self._as_of_date
 
+    # ----------------------------------
+    # Volume, energy, total cost and all component cost sensor names.
+    def _sensor_names(self) -> list[str]:
+        return [
+            self._volume_sensor_name,
+            self._energy_sensor_name,
+            self._total_cost_sensor_name,
+            *self._component_sensor_names.values(),
+        ]
+
     # ----------------------------------
     # Publish Gaspar data to Home Assistant WS
-    async def publish(self):  # pylint: disable=too-many-branches, too-many-statements
+    # Return True if new data has been published.
+    async def publish(self) -> bool:
+
+        readings = await self.fetch()
+
+        publications = self.transform(readings)
+
+        return await self.publish_statistics(publications)
+
+    # ----------------------------------
+    # Fetch stage: prepare the sensors in Home Assistant (migration, reset, repair), find their last statistics and
+    # fetch the new daily readings from GrDF.
+    async def fetch(self) -> GazparReadings:
 
         # As of date
         as_of_date = self.as_of_date()
         Logger.debug(f"As of date: {as_of_date}")
 
-        # Volume, energy and cost sensor names.
-        volume_sensor_name = f"sensor.{self._name}_volume"
-        energy_sensor_name = f"sensor.{self._name}_energy"
-        total_cost_sensor_name = f"sensor.{self._name}_total_cost"
-
-        # Generate component cost sensor names dynamically
-        component_sensor_names = {}
-        if self._pricing_config is not None:
-            for component_name in self._pricing_config.get_components().keys():
-                sensor_suffix = self._get_legacy_sensor_suffix(component_name)
-                sensor_name = f"sensor.{self._name}_{sensor_suffix}"
-                component_sensor_names[component_name] = sensor_name
-
         # Automatic migration from v0.3.x to v0.4.0
         # Migrate old sensor.{name}_cost to sensor.{name}_total_cost if pricing is enabled
         if self._pricing_config is not None:
@@ -109,7 +184,7 @@ class Gazpar:
                 old_total_cost_sensor_name = f"sensor.{self._name}_cost"
                 await self._homeassistant.migrate_statistic(
                     old_entity_id=old_total_cost_sensor_name,
-                    new_entity_id=total_cost_sensor_name,
+                    new_entity_id=self._total_cost_sensor_name,
                     new_name="Gazpar2HAWS Total Cost",
                     unit_class=None,
                     unit_of_measurement=self._convert_euro_symbol_to_iso4217("€"),
@@ -119,114 +194,152 @@ class Gazpar:
             except Exception:  # pylint: disable=broad-except
                 Logger.warning(
                     f"Error during automatic sensor migration from "
-                    f"{old_total_cost_sensor_name} to {total_cost_sensor_name}: "
+                    f"{old_total_cost_sensor_name} to {self._total_cost_sensor_name}: "
                     f"{traceback.format_exc()}"
                 )
 
         # Eventually reset the sensor in Home Assistant
         if self._reset:
             try:
-                sensors_to_clear = [volume_sensor_name, energy_sensor_name, total_cost_sensor_name]
-                # Add all component cost sensors dynamically
-                sensors_to_clear.extend(component_sensor_names.values())
-                await self._homeassistant.clear_statistics(sensors_to_clear)
+                await self._homeassistant.clear_statistics(self._sensor_names())
             except Exception:
                 Logger.warning(f"Error while resetting the sensor in Home Assistant: {traceback.format_exc()}")
                 raise
 
-        last_date_and_value_by_sensor = dict[str, tuple[date, float]]()
-
-        last_date_and_value_by_sensor[volume_sensor_name] = await self.find_last_date_and_value(volume_sensor_name)
-        last_date_and_value_by_sensor[energy_sensor_name] = await self.find_last_date_and_value(energy_sensor_name)
-        last_date_and_value_by_sensor[total_cost_sensor_name] = await self.find_last_date_and_value(
-            total_cost_sensor_name
-        )
+        # Eventually repair the sums of the sensors in Home Assistant
+        if self._repair and not self._reset:
+            try:
+                await self.repair(as_of_date)
+            except Exception:
+                Logger.warning(f"Error while repairing the sensors in Home Assistant: {traceback.format_exc()}")
+                raise
 
-        # Get last date and value for all component cost sensors dynamically
-        for sensor_name in component_sensor_names.values():
-            last_date_and_value_by_sensor[sensor_name] = await self.find_last_date_and_value(sensor_name)
+        # Get last date and value for volume, energy, total cost and all component cost sensors in one request.
+        last_date_and_value_by_sensor = await self.find_last_dates_and_values(self._sensor_names())
 
         # Compute the start date as the minimum of the last dates plus one day
         start_date = min(min(v[0] for v in last_date_and_value_by_sensor.values()) + timedelta(days=1), as_of_date)
 
+        Logger.debug(f"Min start date for all sensors: {start_date}")
+
+        # Fetch the data from GrDF, unless the next daily reading is not expected to be published yet
+        if self._is_publication_expected(start_date - timedelta(days=1)):
+            fetch_time = self._local_now()
+            daily_history = await self.async_fetch_daily_gazpar_history(start_date, as_of_date)
+            if self._publication_gate is not None and len(daily_history) > 0:
+                self._publication_gate.record(
+                    max(v[0] for v in last_date_and_value_by_sensor.values()), daily_history.last_date(), fetch_time
+                )
+        else:
+            daily_history = DailyReadings.empty(READING_PROPERTY_NAMES)
+
+        # The end date is the last date of the daily history
+        if daily_history is None or len(daily_history) == 0:
+            end_date = start_date
+            self._last_known_date = start_date - timedelta(days=1)
+        else:
+            end_date = daily_history.last_date()
+            self._last_known_date = end_date
+
+        Logger.debug(f"End date: {end_date}")
+
+        return GazparReadings(
+            end_date=end_date,
+            daily_history=daily_history,
+            last_date_and_value_by_sensor=last_date_and_value_by_sensor,
+        )
+
+    # ----------------------------------
+    # Transform stage: extract the volume and energy from the readings, compute the costs, and return the value
+    # arrays to publish for each sensor.
+    def transform(  # pylint: disable=too-many-branches, too-many-statements
+        self, readings: GazparReadings
+    ) -> list[SensorPublication]:
+
+        daily_history = readings.daily_history
+        end_date = readings.end_date
+        last_date_and_value_by_sensor = readings.last_date_and_value_by_sensor
+
         # Get all start dates
-        energy_start_date = last_date_and_value_by_sensor[energy_sensor_name][0] + timedelta(days=1)
-        volume_start_date = last_date_and_value_by_sensor[volume_sensor_name][0] + timedelta(days=1)
-        total_cost_start_date = last_date_and_value_by_sensor[total_cost_sensor_name][0] + timedelta(days=1)
+        energy_start_date = last_date_and_value_by_sensor[self._energy_sensor_name][0] + timedelta(days=1)
+        volume_start_date = last_date_and_value_by_sensor[self._volume_sensor_name][0] + timedelta(days=1)
+        total_cost_start_date = last_date_and_value_by_sensor[self._total_cost_sensor_name][0] + timedelta(days=1)
 
         # Get the minimum cost start date from all component sensors
         cost_start_dates = [total_cost_start_date]
-        for sensor_name in component_sensor_names.values():
+        for sensor_name in self._component_sensor_names.values():
             cost_start_dates.append(last_date_and_value_by_sensor[sensor_name][0] + timedelta(days=1))
         cost_start_date = min(cost_start_dates)
 
-        Logger.debug(f"Min start date for all sensors: {start_date}")
         Logger.debug(f"Energy start date: {energy_start_date}")
         Logger.debug(f"Volume start date: {volume_start_date}")
         Logger.debug(f"Total cost start date: {total_cost_start_date}")
 
         # Log each component cost start date
-        for component_name, sensor_name in component_sensor_names.items():
+        for component_name, sensor_name in self._component_sensor_names.items():
             component_start_date = last_date_and_value_by_sensor[sensor_name][0] + timedelta(days=1)
             Logger.debug(f"{component_name} cost start date: {component_start_date}")
 
         Logger.debug(f"Min cost start date: {cost_start_date}")
 
-        # Fetch the data from GrDF and publish it to Home Assistant
-        daily_history = self.fetch_daily_gazpar_history(start_date, as_of_date)
-
-        # The end date is the last date of the daily history
-        if daily_history is None or len(daily_history) == 0:
-            end_date = start_date
-        else:
-            end_date = datetime.strptime(daily_history[-1][pygazpar.PropertyName.TIME_PERIOD.value], "%d/%m/%Y").date()
+        publications = list[SensorPublication]()
 
-        Logger.debug(f"End date: {end_date}")
+        # Extract the volume and the energy from the daily history at once, on a date axis shared by all the sensors
+        volume_name = pygazpar.PropertyName.VOLUME.value
+        energy_name = pygazpar.PropertyName.ENERGY.value
+        energy_and_cost_start_date = min(energy_start_date, cost_start_date)
 
-        # Extract the volume from the daily history
-        volume_array = self.extract_property_from_daily_gazpar_history(
+        date_arrays, missing_days = self.extract_properties_from_daily_gazpar_history(
             daily_history,
-            pygazpar.PropertyName.VOLUME.value,
-            volume_start_date,
+            [volume_name, energy_name],
+            min(volume_start_date, energy_and_cost_start_date),
             end_date,
         )
 
-        # Extract the energy from the daily history
-        energy_array = self.extract_property_from_daily_gazpar_history(
-            daily_history,
-            pygazpar.PropertyName.ENERGY.value,
-            min(energy_start_date, cost_start_date),
-            end_date,
-        )
+        Logger.debug(f"Days without reading: {int(missing_days.sum())}")
+
+        # Restrict the volume and the energy to their own start date
+        volume_array = date_arrays[volume_name]
+        if volume_array is not None and daily_history.has_values(volume_name, volume_start_date, end_date):
+            volume_array = volume_array[volume_start_date : end_date + timedelta(days=1)]
+        else:
+            volume_array = None
+
+        energy_array = date_arrays[energy_name]
+        if energy_array is None or not daily_history.has_values(energy_name, energy_and_cost_start_date, end_date):
+            energy_array = None
 
         # Publish the volume and energy to Home Assistant
         if volume_array is not None:
-            await self.publish_date_array(
-                volume_sensor_name,
-                "Gazpar2HAWS Volume",
-                "volume",
-                "m³",
-                volume_array,
-                last_date_and_value_by_sensor[volume_sensor_name][1],
+            publications.append(
+                SensorPublication(
+                    entity_id=self._volume_sensor_name,
+                    entity_name="Gazpar2HAWS Volume",
+                    unit_class="volume",
+                    unit_of_measurement="m³",
+                    sum_array=volume_array.cumsum() + last_date_and_value_by_sensor[self._volume_sensor_name][1],
+                )
             )
         else:
             Logger.info("No volume data to publish")
 
         if energy_array is not None and energy_start_date <= end_date:
-            await self.publish_date_array(
-                energy_sensor_name,
-                "Gazpar2HAWS Energy",
-                "energy",
-                "kWh",
-                energy_array[energy_start_date : end_date + timedelta(days=1)],
-                last_date_and_value_by_sensor[energy_sensor_name][1],
+            publications.append(
+                SensorPublication(
+                    entity_id=self._energy_sensor_name,
+                    entity_name="Gazpar2HAWS Energy",
+                    unit_class="energy",
+                    unit_of_measurement="kWh",
+                    sum_array=energy_array[energy_start_date : end_date + timedelta(days=1)].cumsum()
+                    + last_date_and_value_by_sensor[self._energy_sensor_name][1],
+                )
             )
         else:
             Logger.info("No energy data to publish")
 
         if self._pricing_config is None:
             Logger.info("No pricing configuration provided")
-            return
+            return publications
 
         # Compute the cost from the energy
         if energy_array is not None:
@@ -247,103 +360,390 @@ class Gazpar:
 
         # Publish the cost breakdown to Home Assistant
         if cost_breakdown is not None:
-            # Publish all component costs dynamically
+            cost_frame = cost_breakdown.get_cost_frame()
+            if cost_frame is None:
+                raise ValueError("The cost breakdown has no cost frame")
+
             component_costs = cost_breakdown.get_component_costs()
+
+            # Sensor of each cost frame column (a component cost or the total)
+            sensor_name_by_column = {
+                component_cost.name: self._component_sensor_names[component_name]
+                for component_name, component_cost in component_costs.items()
+            }
+            sensor_name_by_column[cost_breakdown.total.name] = self._total_cost_sensor_name
+
+            # Cumulative sums of all the costs, from their last sums in Home Assistant, in a single operation
+            sum_frame = cost_frame.cumsum(
+                [last_date_and_value_by_sensor[sensor_name_by_column[column]][1] for column in cost_frame.columns]
+            )
+
+            # Publish all component costs dynamically
             for component_name, component_cost in component_costs.items():
-                sensor_name = component_sensor_names[component_name]
-                friendly_name = self._generate_friendly_name(component_name)
-
-                await self.publish_date_array(
-                    sensor_name,
-                    friendly_name,
-                    None,
-                    self._convert_euro_symbol_to_iso4217(component_cost.value_unit),
-                    component_cost.value_array,
-                    last_date_and_value_by_sensor[sensor_name][1],
+                publications.append(
+                    SensorPublication(
+                        entity_id=self._component_sensor_names[component_name],
+                        entity_name=self._generate_friendly_name(component_name),
+                        unit_class=None,
+                        unit_of_measurement=self._convert_euro_symbol_to_iso4217(component_cost.value_unit),  # type: ignore[arg-type]
+                        sum_array=sum_frame[component_cost.name],  # type: ignore[index]
+                    )
                 )
 
             # Publish total cost
-            await self.publish_date_array(
-                total_cost_sensor_name,
-                "Gazpar2HAWS Total Cost",
-                None,
-                self._convert_euro_symbol_to_iso4217(cost_breakdown.total.value_unit),
-                cost_breakdown.total.value_array,
-                last_date_and_value_by_sensor[total_cost_sensor_name][1],
+            publications.append(
+                SensorPublication(
+                    entity_id=self._total_cost_sensor_name,
+                    entity_name="Gazpar2HAWS Total Cost",
+                    unit_class=None,
+                    unit_of_measurement=self._convert_euro_symbol_to_iso4217(cost_breakdown.total.value_unit),  # type: ignore[arg-type]
+                    sum_array=sum_frame[cost_breakdown.total.name],  # type: ignore[index]
+                )
             )
         else:
             Logger.info("No cost data to publish")
 
+        return publications
+
     # ----------------------------------
-    # Fetch daily Gazpar history.
-    def fetch_daily_gazpar_history(self, start_date: date, end_date: date) -> MeterReadings:
+    # Publish stage: import the statistics of each sensor to Home Assistant. Return True if new data has been published.
+    # The statistics of all the sensors are built first, so that they are all in the outbox before the first import.
+    async def publish_statistics(self, publications: list[SensorPublication]) -> bool:
+
+        # The sensors on the same date axis (e.g. all the costs) share the start times of their statistics.
+        start_times_by_axis = dict[tuple[date, date], list[str]]()
+
+        sensor_statistics = list[SensorStatistics]()
+        for publication in publications:
+            axis = (publication.sum_array.start_date, publication.sum_array.end_date)
+            if axis not in start_times_by_axis:
+                start_times_by_axis[axis] = local_midnight_iso_strings(publication.sum_array.dates(), self._timezone)
+
+            sensor_statistics.append(
+                SensorStatistics(
+                    entity_id=publication.entity_id,
+                    source="recorder",
+                    name=publication.entity_name,
+                    unit_class=publication.unit_class,
+                    unit_of_measurement=publication.unit_of_measurement,
+                    statistics=self.build_statistics(publication.sum_array, start_times_by_axis[axis]),
+                )
+            )
 
-        if start_date >= end_date:
-            Logger.info("No data to fetch")
-            return []
+        # Publish statistics to Home Assistant
+        try:
+            await self._homeassistant.import_sensor_statistics(sensor_statistics)
+        except Exception:
+            Logger.warning(f"Error while importing statistics to Home Assistant: {traceback.format_exc()}")
+            raise
 
-        # Instantiate the right data source.
-        data_source = self._create_data_source()
+        return len(publications) > 0
 
-        # Initialize PyGazpar client
-        client = pygazpar.Client(data_source)
+    # ----------------------------------
+    # Repair the sums of the sensors in Home Assistant over the last days from the GrDF history.
+    async def repair(self, as_of_date: date):
 
-        try:
-            history = client.load_date_range(
-                pce_identifier=self._pce_identifier,
-                start_date=start_date,
-                end_date=end_date,
-                frequencies=[pygazpar.Frequency.DAILY],
+        start_date = as_of_date - timedelta(days=self._last_days)
+
+        daily_history = await self.async_fetch_daily_gazpar_history(start_date, as_of_date)
+
+        if daily_history is None or len(daily_history) == 0:
+            Logger.info("No data to repair")
+            return
+
+        end_date = daily_history.last_date()
+
+        date_arrays, _ = self.extract_properties_from_daily_gazpar_history(
+            daily_history,
+            [pygazpar.PropertyName.VOLUME.value, pygazpar.PropertyName.ENERGY.value],
+            start_date,
+            end_date,
+        )
+
+        volume_array = date_arrays[pygazpar.PropertyName.VOLUME.value]
+        if volume_array is not None:
+            await self.repair_date_array(self._volume_sensor_name, "m³", volume_array)
+
+        energy_array = date_arrays[pygazpar.PropertyName.ENERGY.value]
+        if energy_array is not None:
+            await self.repair_date_array(self._energy_sensor_name, "kWh", energy_array)
+
+        if self._pricing_config is None or energy_array is None:
+            return
+
+        quantities = ConsumptionQuantityArray(
+            start_date=start_date,
+            end_date=end_date,
+            value_unit=QuantityUnit.KWH,
+            base_unit=TimeUnit.DAY,
+            value_array=energy_array,
+        )
+
+        cost_breakdown = Pricer(self._pricing_config).compute(quantities, PriceUnit.EURO)
+
+        for component_name, component_cost in cost_breakdown.get_component_costs().items():
+            await self.repair_date_array(
+                self._component_sensor_names[component_name],
+                self._convert_euro_symbol_to_iso4217(component_cost.value_unit),  # type: ignore[arg-type]
+                component_cost.value_array,  # type: ignore[arg-type]
             )
 
+        await self.repair_date_array(
+            self._total_cost_sensor_name,
+            self._convert_euro_symbol_to_iso4217(cost_breakdown.total.value_unit),  # type: ignore[arg-type]
+            cost_breakdown.total.value_array,  # type: ignore[arg-type]
+        )
+
+    # ----------------------------------
+    # Compare the sums of a sensor in Home Assistant with the cumulative sum of the date array, and adjust them
+    # from each date they diverge: one adjust request per divergence instead of clearing and importing every row.
+    # The cumulative sum is anchored on the Home Assistant sum of the day before the date array (or on the first
+    # compared day when there is none). Return the number of adjustments.
+    async def repair_date_array(
+        self,
+        entity_id: str,
+        unit_of_measurement: str,
+        date_array: DateArray,
+        tolerance: float = 1e-6,
+    ) -> int:
+
+        timezone = pytz.timezone(self._timezone)
+
+        start_time = timezone.localize(datetime.combine(date_array.start_date - timedelta(days=1), datetime.min.time()))
+        end_time = timezone.localize(datetime.combine(date_array.end_date + timedelta(days=1), datetime.min.time()))
+
+        statistics = await self._homeassistant.statistics_during_period([entity_id], start_time, end_time, ["sum"])
+
+        sum_by_date = {
+            timestamp_ms_to_date(statistic["start"], self._timezone): float(statistic["sum"])
+            for statistic in statistics.get(entity_id, [])
+            if statistic.get("sum") is not None
+        }
+
+        if len(sum_by_date) == 0:
+            Logger.debug(f"Entity '{entity_id}' => No statistics to repair.")
+            return 0
+
+        total_array = date_array.cumsum()
+
+        initial_value = sum_by_date.get(date_array.start_date - timedelta(days=1))
+
+        adjustment_count = 0
+        applied_delta = 0.0
+        for dt, total in total_array:
+            if dt not in sum_by_date:
+                continue
+
+            if initial_value is None:
+                initial_value = sum_by_date[dt] - total
+
+            delta = initial_value + total - sum_by_date[dt]
+
+            if abs(delta - applied_delta) > tolerance:
+                Logger.info(f"Entity '{entity_id}' => Sum diverges by {delta - applied_delta} from {dt}: adjusting.")
+                await self._homeassistant.adjust_sum_statistics(
+                    entity_id,
+                    timezone.localize(datetime.combine(dt, datetime.min.time())),
+                    delta - applied_delta,
+                    unit_of_measurement,
+                )
+                applied_delta = delta
+                adjustment_count += 1
+
+        Logger.debug(f"Entity '{entity_id}' => {adjustment_count} sum adjustments.")
+
+        return adjustment_count
+
+    # ----------------------------------
+    # Tell whether GrDF may have a daily reading after last_known_date, from the learned publication time (always
+    # True if the publication gate is disabled, or for a fixed as_of_date).
+    def _is_publication_expected(self, last_known_date: date) -> bool:
+
+        if self._publication_gate is None or self._as_of_date is not None:
+            return True
+
+        if self._publication_gate.is_open(last_known_date, self._local_now()):
+            return True
+
+        expected_time = self._publication_gate.expected_publication_time(last_known_date + timedelta(days=1))
+        Logger.info(f"Home Assistant is up to date, next GrDF daily reading expected from {expected_time}")
+
+        return False
+
+    # ----------------------------------
+    # Expected time of the GrDF publication of the reading following the last known one (after the last fetch),
+    # or None if it is not known (not learned yet, publication gate disabled or fixed as_of_date).
+    def next_publication_time(self) -> Optional[datetime]:
+
+        if self._publication_gate is None or self._as_of_date is not None or self._last_known_date is None:
+            return None
+
+        expected_time = self._publication_gate.expected_publication_time(self._last_known_date + timedelta(days=1))
+        if expected_time is None:
+            return None
+
+        return pytz.timezone(self._timezone).localize(expected_time)
+
+    # ----------------------------------
+    # Current time in the device timezone (without timezone information).
+    def _local_now(self) -> datetime:
+        return datetime.now(pytz.timezone(self._timezone)).replace(tzinfo=None)
+
+    # ----------------------------------
+    # Fetch daily Gazpar history in a worker thread, so that the event loop keeps serving Home Assistant (pings,
+    # other devices) during the GrDF login and download. The fetch is abandoned after running for fetch_timeout
+    # seconds (the time spent waiting for a free worker thread does not count).
+    async def async_fetch_daily_gazpar_history(self, start_date: date, end_date: date) -> DailyReadings:
+
+        # A worker thread cannot be interrupted: while an abandoned fetch is still running, no other one is started,
+        # so that a hung GrDF call holds at most one thread of the pool per device.
+        if len(self._abandoned_fetches) > 0:
+            Logger.warning("A GrDF fetch abandoned after a timeout is still running: no new fetch is started")
+            return DailyReadings.empty(READING_PROPERTY_NAMES)
+
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+
+        def fetch() -> DailyReadings:
+            loop.call_soon_threadsafe(started.set)
+            return self.fetch_daily_gazpar_history(start_date, end_date)
+
+        future = loop.run_in_executor(self._executor, fetch)
+
+        # Wait for a worker thread to start the fetch (or for the fetch to fail before starting).
+        started_task: asyncio.Future = asyncio.ensure_future(started.wait())
+        try:
+            await asyncio.wait({future, started_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            started_task.cancel()
+
+        done, _ = await asyncio.wait({future}, timeout=self._fetch_timeout)
+        if future in done:
+            return future.result()
+
+        # The result of the abandoned fetch is discarded when its worker thread completes.
+        self._abandoned_fetches.add(future)
+        future.add_done_callback(self._on_abandoned_fetch_done)
+
+        Logger.warning(
+            f"Timeout after {self._fetch_timeout} seconds while fetching data from GrDF: "
+            f"the fetch is abandoned but its worker thread keeps running until GrDF answers"
+        )
+        return DailyReadings.empty(READING_PROPERTY_NAMES)
+
+    # ----------------------------------
+    # Called when the worker thread of an abandoned fetch completes.
+    def _on_abandoned_fetch_done(self, future: asyncio.Future):
+
+        self._abandoned_fetches.discard(future)
+
+        if not future.cancelled() and future.exception() is not None:
+            Logger.warning(f"Abandoned GrDF fetch failed: {future.exception()}")
+        else:
+            Logger.info("Abandoned GrDF fetch completed: its result is discarded")
+
+    # ----------------------------------
+    # Fetch daily Gazpar history (parsed once into columns).
+    def fetch_daily_gazpar_history(self, start_date: date, end_date: date) -> DailyReadings:
+
+        if start_date >= end_date:
+            Logger.info("No data to fetch")
+            return DailyReadings.empty(READING_PROPERTY_NAMES)
+
+        try:
+            if self._readings_cache is not None:
+                readings = self._fetch_cached_daily_readings(start_date, end_date)
+            else:
+                readings = self._fetch_grdf_daily_readings(start_date, end_date)
+
             # Filter the daily readings by keeping only dates between start_date and end_date
-            res = []
-            for reading in history[pygazpar.Frequency.DAILY.value]:
-                reading_date = datetime.strptime(reading[pygazpar.PropertyName.TIME_PERIOD.value], "%d/%m/%Y").date()
-                if start_date <= reading_date <= end_date:
-                    res.append(reading)
+            res = DailyReadings.from_meter_readings(readings, READING_PROPERTY_NAMES).between(start_date, end_date)
 
             Logger.debug(f"Fetched {len(res)} daily readings from start date {start_date} to end date {end_date}")
         except Exception:  # pylint: disable=broad-except
             Logger.warning(f"Error while fetching data from GrDF: {traceback.format_exc()}")
-            res = MeterReadings()
+            res = DailyReadings.empty(READING_PROPERTY_NAMES)
 
         return res
 
+    # ----------------------------------
+    # Fetch daily readings from GrDF.
+    def _fetch_grdf_daily_readings(self, start_date: date, end_date: date) -> MeterReadings:
+
+        # Instantiate the right data source.
+        data_source = self._create_data_source()
+
+        # Initialize PyGazpar client
+        client = pygazpar.Client(data_source)
+
+        history = client.load_date_range(
+            pce_identifier=self._pce_identifier,
+            start_date=start_date,
+            end_date=end_date,
+            frequencies=[pygazpar.Frequency.DAILY],
+        )
+
+        return history[pygazpar.Frequency.DAILY.value]
+
+    # ----------------------------------
+    # Fetch daily readings from the local cache, and from GrDF only the days unknown or not final yet.
+    # If GrDF fails, the cached readings are still returned.
+    def _fetch_cached_daily_readings(self, start_date: date, end_date: date) -> MeterReadings:
+
+        if self._readings_cache is None:
+            raise ValueError("Readings cache is not configured")
+
+        cache_key = self._pce_identifier if self._pce_identifier is not None else self._name
+
+        known_days = self._readings_cache.load(cache_key, start_date, end_date)
+
+        # The recent days are counted from the current date of the device, like the publication gate does
+        as_of_date = self._as_of_date if self._as_of_date is not None else self._local_now().date()
+
+        fetch_start_date = self._readings_cache.first_date_to_fetch(known_days, start_date, end_date, as_of_date)
+
+        if fetch_start_date is None:
+            Logger.debug(f"All daily readings from {start_date} to {end_date} are in the local cache")
+        else:
+            Logger.debug(
+                f"{len(known_days)} days in the local cache, fetching daily readings from {fetch_start_date} to {end_date}"
+            )
+            try:
+                grdf_readings = self._fetch_grdf_daily_readings(fetch_start_date, end_date)
+                self._readings_cache.store(cache_key, fetch_start_date, end_date, grdf_readings)
+                known_days = self._readings_cache.load(cache_key, start_date, end_date)
+            except Exception:  # pylint: disable=broad-except
+                Logger.warning(
+                    f"Error while fetching data from GrDF, using the local cache only: {traceback.format_exc()}"
+                )
+
+        return [reading for reading in known_days.values() if reading is not None]
+
     # ----------------------------------
     # Extract a given property from the daily Gazpar history and return a DateArray.
     def extract_property_from_daily_gazpar_history(
         self,
-        readings: MeterReadings,
+        readings: DailyReadings,
         property_name: str,
         start_date: date,
         end_date: date,
     ) -> Optional[DateArray]:
 
-        # Fill the quantity array.
-        res: Optional[DateArray] = None
+        # Days without a reading are left to 0, None if there is no reading at all in the range.
+        return readings.to_date_array(property_name, start_date, end_date)
 
-        for reading in readings:
-            # Parse date format DD/MM/YYYY into datetime.
-            reading_date = datetime.strptime(reading[pygazpar.PropertyName.TIME_PERIOD.value], "%d/%m/%Y").date()
-
-            # Skip all readings before the start date.
-            if reading_date < start_date:
-                # Logger.debug(f"Skip date: {reading_date} < {start_date}")
-                continue
-
-            # Skip all readings after the end date.
-            if reading_date > end_date:
-                # Logger.debug(f"Skip date: {reading_date} > {end_date}")
-                continue
-
-            # Fill the quantity array.
-            if reading[property_name] is not None:
-                if res is None:
-                    res = DateArray(name=property_name, start_date=start_date, end_date=end_date)
-                res[reading_date] = reading[property_name]
+    # ----------------------------------
+    # Extract several properties from the daily Gazpar history in one pass: return DateArrays aligned on the same
+    # dates (None for a property without any value) and the mask of the days without reading.
+    def extract_properties_from_daily_gazpar_history(
+        self,
+        readings: DailyReadings,
+        property_names: list[str],
+        start_date: date,
+        end_date: date,
+    ) -> tuple[dict[str, Optional[DateArray]], np.ndarray]:
 
-        return res
+        return readings.to_date_arrays(property_names, start_date, end_date)
 
     # ----------------------------------
     # Push a date array to Home Assistant.
@@ -355,21 +755,10 @@ class Gazpar:
         unit_of_measurement: str,
         date_array: DateArray,
         initial_value: float,
+        start_times: Optional[list[str]] = None,
     ):
 
-        # Compute the cumulative sum of the values.
-        total_array = date_array.cumsum() + initial_value
-
-        # Timezone
-        timezone = pytz.timezone(self._timezone)
-
-        # Fill the statistics.
-        statistics = []
-        for dt, total in total_array:
-            # Set the timezone
-            date_time = datetime.combine(dt, datetime.min.time())
-            date_time = timezone.localize(date_time)
-            statistics.append({"start": date_time.isoformat(), "state": total, "sum": total})
+        statistics = self.build_statistics(date_array.cumsum() + initial_value, start_times)
 
         # Publish statistics to Home Assistant
         try:
@@ -380,6 +769,20 @@ class Gazpar:
             Logger.warning(f"Error while importing statistics to Home Assistant: {traceback.format_exc()}")
             raise
 
+    # ----------------------------------
+    # Statistics of an array of cumulative sums, at the start of each day.
+    def build_statistics(self, sum_array: DateArray, start_times: Optional[list[str]] = None) -> list[dict]:
+
+        # The start of each day (local midnight) is computed for the whole range at once, unless already known for
+        # this date axis.
+        if start_times is None:
+            start_times = local_midnight_iso_strings(sum_array.dates(), self._timezone)
+
+        return [
+            {"start": start_time, "state": total, "sum": total}
+            for start_time, total in zip(start_times, sum_array.array.tolist())  # type: ignore[union-attr]
+        ]
+
     # ----------------------------------
     # Create the data source.
     def _create_data_source(self) -> pygazpar.datasource.IDataSource:
@@ -401,31 +804,50 @@ class Gazpar:
     # Find last date, value of the entity.
     async def find_last_date_and_value(self, entity_id: str) -> tuple[date, float]:
 
+        last_date_and_value_by_entity = await self.find_last_dates_and_values([entity_id])
+
+        return last_date_and_value_by_entity[entity_id]
+
+    # ----------------------------------
+    # Find last date, value of several entities with a single statistics request to Home Assistant.
+    async def find_last_dates_and_values(self, entity_ids: list[str]) -> dict[str, tuple[date, float]]:
+
         # As of date
         as_of_date = self.as_of_date()
 
-        # Check the existence of the sensor in Home Assistant
-        try:
-            exists_statistic_id = await self._homeassistant.exists_statistic_id(entity_id, "sum")
-        except Exception:
-            Logger.warning(
-                f"Error while checking the existence of the entity '{entity_id}' in Home Assistant: {traceback.format_exc()}"
-            )
-            raise
+        # Check the existence of the sensors in Home Assistant
+        existing_entity_ids = list[str]()
+        for entity_id in entity_ids:
+            try:
+                if await self._homeassistant.exists_statistic_id(entity_id, "sum"):
+                    existing_entity_ids.append(entity_id)
+                else:
+                    Logger.debug(f"Entity '{entity_id}' does not exist in Home Assistant.")
+            except Exception:
+                Logger.warning(
+                    f"Error while checking the existence of the entity '{entity_id}' in Home Assistant: {traceback.format_exc()}"
+                )
+                raise
 
-        if exists_statistic_id:
-            # Get the last statistic from Home Assistant
+        # Get the last statistics of all the existing sensors from Home Assistant
+        last_statistic_by_entity = dict[str, dict]()
+        if len(existing_entity_ids) > 0:
             try:
                 as_of_datetime = datetime.combine(as_of_date, datetime.min.time())
                 as_of_datetime = pytz.timezone(self._timezone).localize(as_of_datetime)
 
-                last_statistic = await self._homeassistant.get_last_statistic(
-                    entity_id, as_of_datetime, self._last_days
+                last_statistic_by_entity = await self._homeassistant.get_last_statistics(
+                    existing_entity_ids, as_of_datetime, self._last_days
                 )
             except HomeAssistantWSException:
                 Logger.warning(
-                    f"Error while fetching last statistics of the entity '{entity_id}' from Home Assistant: {traceback.format_exc()}"
+                    f"Error while fetching last statistics of the entities {existing_entity_ids} from Home Assistant: {traceback.format_exc()}"
                 )
+                raise
+
+        res = dict[str, tuple[date, float]]()
+        for entity_id in entity_ids:
+            last_statistic = last_statistic_by_entity.get(entity_id)
 
             if last_statistic:
                 # Extract the end date of the last statistics from the unix timestamp
@@ -433,24 +855,21 @@ class Gazpar:
 
                 # Get the last meter value
                 last_value = float(str(last_statistic.get("sum")))
+            else:
+                if entity_id in existing_entity_ids:
+                    Logger.debug(f"Entity '{entity_id}' => No statistics found.")
 
-                Logger.debug(f"Entity '{entity_id}' => Last date: {last_date}, last value: {last_value}")
+                # Compute the corresponding last_date
+                last_date = as_of_date - timedelta(days=self._last_days)
 
-                return last_date, last_value
+                # If no statistic, the last value is initialized to zero
+                last_value = 0.0
 
-            Logger.debug(f"Entity '{entity_id}' => No statistics found.")
-        else:
-            Logger.debug(f"Entity '{entity_id}' does not exist in Home Assistant.")
+            Logger.debug(f"Entity '{entity_id}' => Last date: {last_date}, last value: {last_value}")
 
-        # Compute the corresponding last_date
-        last_date = as_of_date - timedelta(days=self._last_days)
+            res[entity_id] = (last_date, last_value)
 
-        # If no statistic, the last value is initialized to zero
-        last_value = 0
-
-        Logger.debug(f"Entity '{entity_id}' => Last date: {last_date}, last value: {last_value}")
-
-        return last_date, last_value
+        return res
 
     # ---------------------------------
     # Helper methods for dynamic sensor naming
@@ -1,11 +1,20 @@
-import json
+import asyncio
 import logging
+import random
+import time
 from datetime import date, datetime, timedelta
+from typing import Any
 
 import pytz
 import websockets
+from websockets.asyncio.client import ClientConnection
 
-from gazpar2haws.datetime_utils import convert_statistics_timestamps
+from gazpar2haws.datetime_utils import (
+    convert_statistics_timestamps,
+    timestamp_ms_to_datetime,
+)
+from gazpar2haws.json_codec import JsonCodec, get_json_codec
+from gazpar2haws.statistics_outbox import SensorStatistics, StatisticsOutbox
 
 Logger = logging.getLogger(__name__)
 
@@ -15,16 +24,182 @@ class HomeAssistantWSException(Exception):
     pass
 
 
+# ----------------------------------
+class HomeAssistantWSConnectionClosed(HomeAssistantWSException):
+    pass
+
+
+# ----------------------------------
+# Error result returned by Home Assistant for a request (code is e.g. "invalid_format", "unknown_command").
+class HomeAssistantWSRequestError(HomeAssistantWSException):
+    # ----------------------------------
+    def __init__(self, error: Any):
+        super().__init__(f"Request failed: {error}")
+        self.code = error.get("code") if isinstance(error, dict) else None
+
+
+# ----------------------------------
+class StatisticIdRegistry:
+    """
+    Local index of the statistic ids known by Home Assistant, one set per statistic type.
+
+    Each set is loaded once from recorder/list_statistic_ids and kept until it expires (TTL) or is invalidated.
+    In between, it is kept up to date locally after each import or clear of statistics.
+    """
+
+    # ----------------------------------
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._statistic_ids_by_type = dict[str | None, set[str]]()
+        self._loaded_at_by_type = dict[str | None, float]()
+
+    # ----------------------------------
+    # Return the statistic ids of the given type, or None if they are not loaded or expired.
+    def get(self, statistic_type: str | None) -> set[str] | None:
+
+        loaded_at = self._loaded_at_by_type.get(statistic_type)
+
+        if loaded_at is None or time.monotonic() - loaded_at > self._ttl:
+            return None
+
+        return self._statistic_ids_by_type[statistic_type]
+
+    # ----------------------------------
+    def load(self, statistic_type: str | None, statistic_ids: set[str]):
+
+        self._statistic_ids_by_type[statistic_type] = statistic_ids
+        self._loaded_at_by_type[statistic_type] = time.monotonic()
+
+    # ----------------------------------
+    # Register a statistic id under all the loaded types it belongs to (None stands for all types).
+    def add(self, statistic_id: str, statistic_types: list[str]):
+
+        for statistic_type, statistic_ids in self._statistic_ids_by_type.items():
+            if statistic_type is None or statistic_type in statistic_types:
+                statistic_ids.add(statistic_id)
+
+    # ----------------------------------
+    def discard(self, statistic_ids: list[str]):
+
+        for known_statistic_ids in self._statistic_ids_by_type.values():
+            known_statistic_ids.difference_update(statistic_ids)
+
+    # ----------------------------------
+    def invalidate(self):
+
+        self._statistic_ids_by_type.clear()
+        self._loaded_at_by_type.clear()
+
+
+# ----------------------------------
+class ImportChunkSizer:
+    """
+    Split statistics into import chunks bounded by a number of rows and an encoded size.
+
+    The encoded size is estimated from sample rows (the first and the last row of the chunk, since the sums grow
+    along the statistics) instead of encoding every row once more before sending it.
+
+    The number of rows per chunk adapts to the acknowledgement latency of the previous chunks. Home Assistant
+    acknowledges recorder/import_statistics as soon as the import is queued to the recorder, so this latency
+    measures the websocket round trip and the load of the Home Assistant event loop (message decoding and
+    validation), not the time the recorder takes to write the rows: chunks grow while Home Assistant answers
+    quickly and shrink when it is busy.
+    """
+
+    # ----------------------------------
+    def __init__(
+        self,
+        max_bytes: int,
+        initial_rows: int,
+        min_rows: int,
+        max_rows: int,
+        target_latency: float,
+        codec: JsonCodec | None = None,
+    ):
+        self._codec = codec if codec is not None else JsonCodec()
+        self._max_bytes = max_bytes
+        self._min_rows = min_rows
+        self._max_rows = max_rows
+        self._target_latency = target_latency
+        self._rows = max(min_rows, min(initial_rows, max_rows))
+
+    # ----------------------------------
+    def rows(self) -> int:
+        return self._rows
+
+    # ----------------------------------
+    # Return the end index of the chunk starting at start_index.
+    def next_chunk_end(self, statistics: list[dict], start_index: int) -> int:
+
+        end_index = min(len(statistics), start_index + self._rows)
+        if end_index <= start_index:
+            return start_index
+
+        # Estimated encoded size of a row (with its separator): the largest of the sample rows.
+        row_bytes = max(len(self._codec.dumps(statistics[index])) + 1 for index in {start_index, end_index - 1})
+
+        # A chunk always holds at least one row, even if it exceeds the size limit on its own.
+        return min(end_index, start_index + max(1, self._max_bytes // row_bytes))
+
+    # ----------------------------------
+    # Adapt the number of rows per chunk from the latency of an acknowledged chunk.
+    def update(self, chunk_rows: int, latency: float):
+
+        if latency > self._target_latency:
+            self._rows = max(self._min_rows, self._rows // 2)
+        elif latency < self._target_latency / 2 and chunk_rows >= self._rows:
+            self._rows = min(self._max_rows, self._rows * 2)
+
+
 # ----------------------------------
 class HomeAssistantWS:
     # ----------------------------------
-    def __init__(self, host: str, port: int, endpoint: str, token: str):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        endpoint: str,
+        token: str,
+        reconnect_max_attempts: int = 5,
+        reconnect_delay: float = 1.0,
+        reconnect_max_delay: float = 60.0,
+        statistic_ids_ttl: float = 300.0,
+        import_chunk_max_bytes: int = 1024 * 1024,
+        import_chunk_max_rows: int = 5000,
+        import_chunk_target_latency: float = 2.0,
+        import_max_chunks_in_flight: int = 4,
+        json_codec: str = "auto",
+        migration_window_days: int = 90,
+        outbox_file: str | None = None,
+    ):
         self._host = host
         self._port = port
         self._endpoint = endpoint
         self._token = token
-        self._websocket = None
+        self._reconnect_max_attempts = reconnect_max_attempts
+        self._reconnect_delay = reconnect_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._reconnect_lock = asyncio.Lock()
+        self._auto_reconnect = False
+        self._statistic_id_registry = StatisticIdRegistry(statistic_ids_ttl)
+        self._statistic_ids_lock = asyncio.Lock()
+        self._codec = get_json_codec(json_codec)
+        self._import_chunk_sizer = ImportChunkSizer(
+            max_bytes=import_chunk_max_bytes,
+            initial_rows=500,
+            min_rows=50,
+            max_rows=import_chunk_max_rows,
+            target_latency=import_chunk_target_latency,
+            codec=self._codec,
+        )
+        self._import_max_chunks_in_flight = import_max_chunks_in_flight
+        self._migration_window_days = migration_window_days
+        # Statistics batches not imported yet (None if the outbox is disabled)
+        self._outbox = StatisticsOutbox(outbox_file) if outbox_file is not None else None
+        self._websocket: ClientConnection | None = None
         self._message_id = 1
+        self._reader_task: asyncio.Task | None = None
+        self._pending_responses: dict[int, asyncio.Future] = {}
 
     # ----------------------------------
     async def connect(self):
@@ -40,7 +215,7 @@ class HomeAssistantWS:
 
         # When a client connects to the server, the server sends out auth_required.
         connect_response = await self._websocket.recv()
-        connect_response_data = json.loads(connect_response)
+        connect_response_data = self._codec.loads(connect_response)
 
         if connect_response_data.get("type") != "auth_required":
             message = f"Authentication failed: auth_required not received {connect_response_data.get('messsage')}"
@@ -49,17 +224,23 @@ class HomeAssistantWS:
 
         # The first message from the client should be an auth message. You can authorize with an access token.
         auth_message = {"type": "auth", "access_token": self._token}
-        await self._websocket.send(json.dumps(auth_message))
+        await self._websocket.send(self._codec.dumps(auth_message), text=True)
 
         # If the client supplies valid authentication, the authentication phase will complete by the server sending the auth_ok message.
         auth_response = await self._websocket.recv()
-        auth_response_data = json.loads(auth_response)
+        auth_response_data = self._codec.loads(auth_response)
 
         if auth_response_data.get("type") == "auth_invalid":
             message = f"Authentication failed: {auth_response_data.get('messsage')}"
             Logger.warning(message)
             raise HomeAssistantWSException(message)
 
+        # From now on, all incoming messages are routed to their awaiting requests by the reader task.
+        self._reader_task = asyncio.create_task(self._read_messages())
+
+        # Once connected, a lost connection is transparently re-established until disconnect() is called.
+        self._auto_reconnect = True
+
         Logger.debug("Connected to Home Assistant")
 
     # ----------------------------------
@@ -67,27 +248,220 @@ class HomeAssistantWS:
 
         Logger.debug("Disconnecting from Home Assistant...")
 
-        await self._websocket.close()
+        self._auto_reconnect = False
+
+        await self._close()
 
         Logger.debug("Disconnected from Home Assistant")
 
     # ----------------------------------
-    async def send_message(self, message: dict) -> dict | list[dict]:
+    def is_connected(self) -> bool:
 
-        Logger.debug("Sending a message...")
+        return self._websocket is not None and self._reader_task is not None and not self._reader_task.done()
+
+    # ----------------------------------
+    # Check the connection is alive with a ping/pong exchange.
+    async def ping(self, timeout: float = 10.0) -> bool:
+
+        if not self.is_connected():
+            return False
+
+        try:
+            response_data = await asyncio.wait_for(self._request({"type": "ping"}), timeout)
+        except (HomeAssistantWSException, asyncio.TimeoutError) as exc:
+            Logger.debug(f"Ping to Home Assistant failed: {exc}")
+            return False
+
+        return response_data.get("type") == "pong"
+
+    # ----------------------------------
+    # Make sure the connection is up: keep the current one if it answers the ping, reconnect otherwise.
+    # The statistics batches left in the outbox by a previous failure are then imported.
+    async def ensure_connected(self):
+
+        if await self.ping():
+            Logger.debug("Home Assistant connection is alive")
+        else:
+            await self.reconnect()
+
+        await self.replay_outbox()
+
+    # ----------------------------------
+    # Import the statistics batches left in the outbox, oldest first. A batch rejected by Home Assistant is dropped.
+    # On any other error (e.g. the connection is lost again), the replay stops and the remaining batches are kept
+    # for the next one.
+    async def replay_outbox(self):
+
+        if self._outbox is None:
+            return
+
+        batches = self._outbox.pending()
+        if len(batches) == 0:
+            return
+
+        Logger.info(f"Replaying {len(batches)} statistics batch(es) left in the outbox...")
+
+        for batch in batches:
+            try:
+                await self._import_statistics(
+                    batch.entity_id,
+                    batch.source,
+                    batch.name,
+                    batch.unit_class,
+                    batch.unit_of_measurement,
+                    batch.statistics,
+                )
+            except HomeAssistantWSRequestError as exc:
+                Logger.warning(f"Statistics batch of {batch.entity_id} rejected by Home Assistant, dropped: {exc}")
+            except Exception as exc:  # pylint: disable=broad-except
+                Logger.warning(
+                    f"Error while replaying the statistics batch of {batch.entity_id}, "
+                    f"{len(self._outbox.pending())} batch(es) kept in the outbox: {exc}"
+                )
+                return
+            self._outbox.acknowledge(batch.batch_id)
+
+    # ----------------------------------
+    # Reconnect with exponential backoff and jitter.
+    async def reconnect(self):
+
+        # Concurrent requests that lost the connection at the same time share a single reconnection.
+        async with self._reconnect_lock:
+            if await self.ping():
+                return
+
+            await self._close()
+
+            attempt = 0
+            while True:
+                try:
+                    await self.connect()
+                    return
+                except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as exc:
+                    attempt += 1
+                    if attempt >= self._reconnect_max_attempts:
+                        raise HomeAssistantWSException(
+                            f"Unable to connect to Home Assistant after {attempt} attempts: {exc}"
+                        ) from exc
+
+                    delay = min(self._reconnect_max_delay, self._reconnect_delay * 2 ** (attempt - 1))
+                    delay = random.uniform(delay / 2, delay)
+
+                    Logger.warning(
+                        f"Connection to Home Assistant failed (attempt {attempt}/{self._reconnect_max_attempts}): {exc}. "
+                        f"Retrying in {delay:.1f} seconds..."
+                    )
+
+                    await asyncio.sleep(delay)
+
+    # ----------------------------------
+    async def _close(self):
+
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+
+        if self._websocket is not None:
+            await self._websocket.close()
+            self._websocket = None
+
+        self._fail_pending_responses(HomeAssistantWSConnectionClosed("Disconnected from Home Assistant"))
+
+    # ----------------------------------
+    # Background task: read all incoming messages and dispatch them to the pending requests by message id.
+    async def _read_messages(self) -> None:
 
         if self._websocket is None:
-            raise HomeAssistantWSException("Not connected to Home Assistant")
+            return
+
+        error: Exception = HomeAssistantWSConnectionClosed("Connection to Home Assistant closed")
 
-        message["id"] = self._message_id
+        try:
+            while True:
+                # Raw UTF-8 bytes are handed over to the codec which decodes them itself.
+                response = await self._websocket.recv(decode=False)
+                response_data = self._codec.loads(response)
+
+                future = self._pending_responses.pop(response_data.get("id"), None)
+
+                if future is None:
+                    Logger.debug(
+                        f"Ignoring unexpected message: {response_data.get('type')} (id={response_data.get('id')})"
+                    )
+                    continue
+
+                if not future.done():
+                    future.set_result(response_data)
+        except websockets.ConnectionClosed as exc:
+            error = HomeAssistantWSConnectionClosed(f"Connection to Home Assistant closed: {exc}")
+        except Exception as exc:  # pylint: disable=broad-except
+            Logger.warning(f"Error while reading messages from Home Assistant: {exc}")
+            error = HomeAssistantWSException(f"Error while reading messages from Home Assistant: {exc}")
+        finally:
+            self._fail_pending_responses(error)
 
+    # ----------------------------------
+    def _fail_pending_responses(self, error: Exception):
+
+        pending_responses = self._pending_responses
+        self._pending_responses = {}
+
+        for future in pending_responses.values():
+            if not future.done():
+                future.set_exception(error)
+
+    # ----------------------------------
+    # Send a message and wait for the response with the same id (other requests may be in flight meanwhile).
+    async def _request(self, message: dict) -> Any:
+
+        if self._websocket is None or not self.is_connected():
+            raise HomeAssistantWSConnectionClosed("Not connected to Home Assistant")
+
+        message_id = self._message_id
         self._message_id += 1
 
-        await self._websocket.send(json.dumps(message))
+        message["id"] = message_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_responses[message_id] = future
+
+        try:
+            # Messages are always sent as text frames, even when the codec encodes them to bytes.
+            await self._websocket.send(self._codec.dumps(message), text=True)
 
-        response = await self._websocket.recv()
+            return await future
+        except websockets.ConnectionClosed as exc:
+            raise HomeAssistantWSConnectionClosed(f"Connection to Home Assistant closed: {exc}") from exc
+        finally:
+            self._pending_responses.pop(message_id, None)
 
-        response_data = json.loads(response)
+    # ----------------------------------
+    # Send a message and return its result. If the connection is lost while the request is in flight, it is sent
+    # again after reconnecting only if retry is True: Home Assistant may already have applied it, so a command which
+    # is not idempotent (e.g. a sum adjustment) must not be retried.
+    async def send_message(self, message: dict, retry: bool = False) -> dict | list[dict]:
+
+        Logger.debug("Sending a message...")
+
+        # The connection has been lost before sending (e.g. Home Assistant restart): reconnect first.
+        if self._auto_reconnect and not self.is_connected():
+            Logger.warning("Connection to Home Assistant lost. Reconnecting...")
+            await self.reconnect()
+
+        try:
+            response_data = await self._request(message)
+        except HomeAssistantWSConnectionClosed:
+            if not self._auto_reconnect or not retry:
+                raise
+
+            # The connection has been lost while waiting for the response: reconnect and send the message again.
+            Logger.warning("Connection to Home Assistant lost. Reconnecting...")
+            await self.reconnect()
+            response_data = await self._request(message)
 
         Logger.debug("Received response")
 
@@ -95,10 +469,18 @@ class HomeAssistantWS:
             raise HomeAssistantWSException(f"Invalid response message: {response_data}")
 
         if not response_data.get("success"):
-            raise HomeAssistantWSException(f"Request failed: {response_data.get('error')}")
+            raise HomeAssistantWSRequestError(response_data.get("error"))
 
         return response_data.get("result")
 
+    # ----------------------------------
+    # Send several messages at once: all requests are in flight together and results are returned in order.
+    async def send_messages(self, messages: list[dict], retry: bool = False) -> list[dict | list[dict]]:
+
+        Logger.debug(f"Sending {len(messages)} messages...")
+
+        return list(await asyncio.gather(*(self.send_message(message, retry) for message in messages)))
+
     # ----------------------------------
     async def list_statistic_ids(self, statistic_type: str | None = None) -> list[dict]:
 
@@ -110,7 +492,7 @@ class HomeAssistantWS:
         if statistic_type is not None:
             list_statistic_ids_message["statistic_type"] = statistic_type
 
-        response = await self.send_message(list_statistic_ids_message)
+        response = await self.send_message(list_statistic_ids_message, retry=True)
 
         # Check response instance type
         if not isinstance(response, list):
@@ -120,25 +502,45 @@ class HomeAssistantWS:
 
         Logger.debug(f"Listed statistics IDs: {len(response)} ids")
 
+        # Refresh the registry as we have the full list at hand.
+        self._statistic_id_registry.load(
+            statistic_type, {str(statistic_id.get("statistic_id")) for statistic_id in response}
+        )
+
         return response
 
+    # ----------------------------------
+    # Forget the known statistic ids: the next existence check will list them again from Home Assistant.
+    def invalidate_statistic_ids(self):
+
+        self._statistic_id_registry.invalidate()
+
     # ----------------------------------
     async def exists_statistic_id(self, entity_id: str, statistic_type: str | None = None) -> bool:
 
         Logger.debug(f"Checking if {entity_id} exists...")
 
-        statistic_ids = await self.list_statistic_ids(statistic_type)
+        # Concurrent checks share a single list_statistic_ids request.
+        async with self._statistic_ids_lock:
+            statistic_ids = self._statistic_id_registry.get(statistic_type)
+            if statistic_ids is None:
+                await self.list_statistic_ids(statistic_type)
+                statistic_ids = self._statistic_id_registry.get(statistic_type) or set()
 
-        entity_ids = [statistic_id.get("statistic_id") for statistic_id in statistic_ids]
-
-        exists_statistic = entity_id in entity_ids
+        exists_statistic = entity_id in statistic_ids
 
         Logger.debug(f"{entity_id} exists: {exists_statistic}")
 
         return exists_statistic
 
     # ----------------------------------
-    async def statistics_during_period(self, entity_ids: list[str], start_time: datetime, end_time: datetime) -> dict:
+    async def statistics_during_period(
+        self,
+        entity_ids: list[str],
+        start_time: datetime,
+        end_time: datetime,
+        types: list[str] | None = None,
+    ) -> dict:
 
         Logger.debug(f"Getting {entity_ids} statistics during period from {start_time} to {end_time}...")
 
@@ -151,7 +553,11 @@ class HomeAssistantWS:
             "period": "day",
         }
 
-        response = await self.send_message(statistics_message)
+        # Restrict the returned columns (start and end are always returned)
+        if types is not None:
+            statistics_message["types"] = types
+
+        response = await self.send_message(statistics_message, retry=True)
 
         # Check response instance type
         if not isinstance(response, dict):
@@ -168,17 +574,54 @@ class HomeAssistantWS:
 
         Logger.debug(f"Getting last statistic for {entity_id}...")
 
-        statistics = await self.statistics_during_period(
-            [entity_id], as_of_date - timedelta(days=depth_days), as_of_date
-        )
+        last_statistics = await self.get_last_statistics([entity_id], as_of_date, depth_days)
 
-        if not statistics:
+        if entity_id not in last_statistics:
             Logger.warning(f"No statistics found for {entity_id}.")
             return {}
 
-        Logger.debug(f"Last statistic for {entity_id}: {statistics[entity_id][-1]}")
+        return last_statistics[entity_id]
+
+    # ----------------------------------
+    # Get the last statistic of several entities, looking back at most depth_days before as_of_date.
+    # Entities without any statistic in the period are not part of the result.
+    async def get_last_statistics(
+        self,
+        entity_ids: list[str],
+        as_of_date: datetime,
+        depth_days: int,
+        probe_days: int = 7,
+        probe_growth_factor: int = 4,
+    ) -> dict[str, dict]:
+
+        Logger.debug(f"Getting last statistics for {entity_ids}...")
+
+        last_statistics = dict[str, dict]()
+
+        # Probe the most recent days first, then widen the window further in the past only for the entities
+        # not found yet. Each probe covers the days not covered by the previous ones, so the usual case
+        # (statistics up to yesterday) only returns a handful of rows instead of the whole depth_days window.
+        remaining_entity_ids = list(entity_ids)
+        probe_end_days = 0
+        probe_start_days = min(probe_days, depth_days)
+        while len(remaining_entity_ids) > 0 and probe_end_days < depth_days:
+            statistics = await self.statistics_during_period(
+                remaining_entity_ids,
+                as_of_date - timedelta(days=probe_start_days),
+                as_of_date - timedelta(days=probe_end_days),
+                types=["sum"],
+            )
+
+            for entity_id in list(remaining_entity_ids):
+                if statistics.get(entity_id):
+                    last_statistics[entity_id] = statistics[entity_id][-1]
+                    remaining_entity_ids.remove(entity_id)
+                    Logger.debug(f"Last statistic for {entity_id}: {last_statistics[entity_id]}")
 
-        return statistics[entity_id][-1]
+            probe_end_days = probe_start_days
+            probe_start_days = min(probe_start_days * probe_growth_factor, depth_days)
+
+        return last_statistics
 
     # ----------------------------------
     async def import_statistics(
@@ -191,31 +634,131 @@ class HomeAssistantWS:
         statistics: list[dict],
     ):
 
+        await self.import_sensor_statistics(
+            [
+                SensorStatistics(
+                    entity_id=entity_id,
+                    source=source,
+                    name=name,
+                    unit_class=unit_class,
+                    unit_of_measurement=unit_of_measurement,
+                    statistics=statistics,
+                )
+            ]
+        )
+
+    # ----------------------------------
+    # Import the statistics of several sensors, one after the other.
+    # All the batches are added to the outbox before the first one is sent, so that the sensors not imported yet
+    # when the connection fails are replayed later, together with the one in progress.
+    async def import_sensor_statistics(self, sensor_statistics: list[SensorStatistics]):
+
+        if self._outbox is None:
+            for sensor in sensor_statistics:
+                await self._import_statistics(
+                    sensor.entity_id,
+                    sensor.source,
+                    sensor.name,
+                    sensor.unit_class,
+                    sensor.unit_of_measurement,
+                    sensor.statistics,
+                )
+            return
+
+        # The batches are kept in the outbox until Home Assistant has imported them.
+        non_empty_sensors = [sensor for sensor in sensor_statistics if len(sensor.statistics) > 0]
+        batch_ids = self._outbox.add_many(non_empty_sensors)
+
+        for batch_id, sensor in zip(batch_ids, non_empty_sensors):
+            await self._import_statistics(
+                sensor.entity_id,
+                sensor.source,
+                sensor.name,
+                sensor.unit_class,
+                sensor.unit_of_measurement,
+                sensor.statistics,
+            )
+
+            self._outbox.acknowledge(batch_id)
+
+    # ----------------------------------
+    async def _import_statistics(
+        self,
+        entity_id: str,
+        source: str,
+        name: str,
+        unit_class: str | None,
+        unit_of_measurement: str,
+        statistics: list[dict],
+    ):
+
         Logger.debug(f"Importing {len(statistics)} statistics for {entity_id} from {source}...")
 
         if len(statistics) == 0:
             Logger.debug("No statistics to import")
             return
 
+        metadata = {
+            "has_mean": False,
+            "mean_type": 0,
+            "has_sum": True,
+            "statistic_id": entity_id,
+            "source": source,
+            "name": name,
+            "unit_class": unit_class,
+            "unit_of_measurement": unit_of_measurement,
+        }
+
+        # Statistics are sent in chunks (bounded in rows and bytes) and several chunks are kept in flight,
+        # so that large backfills neither hit the websocket message size limit nor stall the recorder.
+        pending_chunks = set[asyncio.Task]()
+        chunk_count = 0
+        start_index = 0
+        try:
+            while start_index < len(statistics) or len(pending_chunks) > 0:
+                while start_index < len(statistics) and len(pending_chunks) < self._import_max_chunks_in_flight:
+                    end_index = self._import_chunk_sizer.next_chunk_end(statistics, start_index)
+                    pending_chunks.add(
+                        asyncio.create_task(self._import_statistics_chunk(metadata, statistics[start_index:end_index]))
+                    )
+                    chunk_count += 1
+                    start_index = end_index
+
+                done_chunks, pending_chunks = await asyncio.wait(pending_chunks, return_when=asyncio.FIRST_COMPLETED)
+
+                errors = [done_chunk.exception() for done_chunk in done_chunks if done_chunk.exception() is not None]
+                if len(errors) > 0:
+                    raise errors[0]  # type: ignore[misc]
+        finally:
+            for pending_chunk in pending_chunks:
+                pending_chunk.cancel()
+
+        self._statistic_id_registry.add(entity_id, ["sum"])
+
+        Logger.debug(f"Imported {len(statistics)} statistics for {entity_id} from {source} in {chunk_count} chunk(s)")
+
+    # ----------------------------------
+    async def _import_statistics_chunk(self, metadata: dict, statistics: list[dict]):
+
         # Import statistics message
         import_statistics_message = {
             "type": "recorder/import_statistics",
-            "metadata": {
-                "has_mean": False,
-                "mean_type": 0,
-                "has_sum": True,
-                "statistic_id": entity_id,
-                "source": source,
-                "name": name,
-                "unit_class": unit_class,
-                "unit_of_measurement": unit_of_measurement,
-            },
+            "metadata": metadata,
             "stats": statistics,
         }
 
-        await self.send_message(import_statistics_message)
+        start_time = time.monotonic()
+
+        await self.send_message(import_statistics_message, retry=False)
 
-        Logger.debug(f"Imported {len(statistics)} statistics for {entity_id} from {source}")
+        latency = time.monotonic() - start_time
+
+        self._import_chunk_sizer.update(len(statistics), latency)
+
+        Logger.debug(
+            f"Imported a chunk of {len(statistics)} statistics in {latency:.3f}s "
+            f"(next chunks: {self._import_chunk_sizer.rows()} rows)"
+        )
 
     # ----------------------------------
     async def clear_statistics(self, entity_ids: list[str]):
@@ -228,10 +771,33 @@ class HomeAssistantWS:
             "statistic_ids": entity_ids,
         }
 
-        await self.send_message(clear_statistics_message)
+        await self.send_message(clear_statistics_message, retry=True)
+
+        self._statistic_id_registry.discard(entity_ids)
 
         Logger.debug(f"Cleared {entity_ids} statistics")
 
+    # ----------------------------------
+    # Add an offset to the sum of all the statistics starting at or after start_time (single request, rows are
+    # updated in place by the recorder instead of being cleared and imported again).
+    async def adjust_sum_statistics(
+        self, entity_id: str, start_time: datetime, adjustment: float, unit_of_measurement: str | None
+    ):
+
+        Logger.debug(f"Adjusting {entity_id} sum statistics from {start_time} by {adjustment}...")
+
+        adjust_sum_statistics_message = {
+            "type": "recorder/adjust_sum_statistics",
+            "statistic_id": entity_id,
+            "start_time": start_time.isoformat(),
+            "adjustment": adjustment,
+            "adjustment_unit_of_measurement": unit_of_measurement,
+        }
+
+        await self.send_message(adjust_sum_statistics_message, retry=False)
+
+        Logger.debug(f"Adjusted {entity_id} sum statistics from {start_time} by {adjustment}")
+
     # ----------------------------------
     async def migrate_statistic(
         self,
@@ -248,10 +814,16 @@ class HomeAssistantWS:
 
         This implements smart detection logic:
         - If old sensor exists but new doesn't: AUTO-MIGRATE data
-        - If both exist: SKIP with warning (prevent data loss)
+        - If both exist and the new sensor stops before the old one: RESUME an interrupted copy
+        - If both exist otherwise: SKIP with warning (prevent data loss)
         - If only new exists: SKIP (normal operation, no old data)
         - On error: LOG WARNING and return False (graceful fallback)
 
+        Copied statistics are streamed in date windows (read, convert, import, then next window), so memory stays
+        bounded by one window. A copy interrupted by an error or a restart leaves the new sensor ending before the
+        old one: the next call detects it from the last row of both sensors and resumes the copy, even after a
+        restart, instead of skipping because the new sensor has data.
+
         Args:
             old_entity_id: Source sensor ID (e.g., sensor.gazpar2haws_cost)
             new_entity_id: Target sensor ID (e.g., sensor.gazpar2haws_total_cost)
@@ -278,60 +850,72 @@ class HomeAssistantWS:
 
             # Check if old and new sensors have data using statistics_during_period
             # This is more reliable than list_statistic_ids which may have caching delays
-            old_statistics_data = await self.statistics_during_period(
-                [old_entity_id], very_old_datetime, as_of_datetime
-            )
-
-            old_has_data = old_entity_id in old_statistics_data and old_statistics_data[old_entity_id]
+            # Only the most recent statistic of each sensor is probed, not the whole history
+            last_statistics = await self.get_last_statistics([old_entity_id, new_entity_id], as_of_datetime, 3650)
 
             # Decision logic
-            if not old_has_data:
+            if old_entity_id not in last_statistics:
                 Logger.debug(f"Old sensor {old_entity_id} does not exist or has no data - no migration needed")
                 return True
 
-            # Query new sensor to check if it already has data
-            new_statistics_data = await self.statistics_during_period(
-                [new_entity_id], very_old_datetime, as_of_datetime
-            )
-
-            new_has_data = new_entity_id in new_statistics_data and new_statistics_data[new_entity_id]
-
-            if new_has_data:
-                Logger.warning(
-                    f"Both old sensor {old_entity_id} and new sensor {new_entity_id} have data. "
-                    f"Skipping migration to prevent data loss. Old sensor can be manually deleted if desired."
-                )
-                return True
-
-            # At this point: old has data AND new doesn't → MIGRATE
-            Logger.info(f"Starting automatic migration: {old_entity_id} → {new_entity_id}")
-
-            old_statistics = old_statistics_data[old_entity_id]
-            Logger.debug(f"Found {len(old_statistics)} statistics entries to migrate from {old_entity_id}")
-
-            # Remove 'change' and 'end' fields from old statistics as they are not accepted by import_statistics
-            for stat in old_statistics:
-                if "change" in stat:
-                    del stat["change"]
-                if "end" in stat:
-                    del stat["end"]
-
-            # Convert start and end timestamps from Unix milliseconds to ISO format strings
-            # because import_statistics expects ISO format (using timezone for consistency)
-            converted_statistics = convert_statistics_timestamps(old_statistics, timezone)
-
-            # Import the statistics to the new sensor with same metadata
-            await self.import_statistics(
-                entity_id=new_entity_id,
-                source="recorder",
-                name=new_name,
-                unit_class=unit_class,
-                unit_of_measurement=unit_of_measurement,
-                statistics=converted_statistics,
-            )
+            if new_entity_id in last_statistics:
+                old_last_start = timestamp_ms_to_datetime(last_statistics[old_entity_id]["start"], timezone)
+                new_last_start = timestamp_ms_to_datetime(last_statistics[new_entity_id]["start"], timezone)
+
+                if new_last_start >= old_last_start:
+                    Logger.warning(
+                        f"Both old sensor {old_entity_id} and new sensor {new_entity_id} have data. "
+                        f"Skipping migration to prevent data loss. Old sensor can be manually deleted if desired."
+                    )
+                    return True
+
+                # The new sensor ends before the old one: a copy has been interrupted. The windows are imported in
+                # order, but the chunks of a window may complete in any order: resume one window before its last row.
+                window_start = max(new_last_start - timedelta(days=self._migration_window_days), very_old_datetime)
+                Logger.info(f"Resuming automatic migration: {old_entity_id} → {new_entity_id} from {window_start}")
+            else:
+                # At this point: old has data AND new doesn't → MIGRATE
+                Logger.info(f"Starting automatic migration: {old_entity_id} → {new_entity_id}")
+
+                window_start = very_old_datetime
+
+            migrated_count = 0
+            while window_start < as_of_datetime:
+                window_end = min(window_start + timedelta(days=self._migration_window_days), as_of_datetime)
+
+                old_statistics_data = await self.statistics_during_period([old_entity_id], window_start, window_end)
+                old_statistics = old_statistics_data.get(old_entity_id, [])
+
+                if len(old_statistics) > 0:
+                    Logger.debug(
+                        f"Migrating {len(old_statistics)} statistics entries from {old_entity_id} "
+                        f"between {window_start} and {window_end}"
+                    )
+
+                    # Remove 'change' and 'end' fields from old statistics as they are not accepted by import_statistics
+                    for stat in old_statistics:
+                        stat.pop("change", None)
+                        stat.pop("end", None)
+
+                    # Convert start timestamps from Unix milliseconds to ISO format strings
+                    # because import_statistics expects ISO format (using timezone for consistency)
+                    converted_statistics = convert_statistics_timestamps(old_statistics, timezone)
+
+                    # Import the statistics to the new sensor with same metadata
+                    await self.import_statistics(
+                        entity_id=new_entity_id,
+                        source="recorder",
+                        name=new_name,
+                        unit_class=unit_class,
+                        unit_of_measurement=unit_of_measurement,
+                        statistics=converted_statistics,
+                    )
+                    migrated_count += len(old_statistics)
+
+                window_start = window_end
 
             Logger.info(
-                f"Successfully migrated {len(old_statistics)} statistics entries "
+                f"Successfully migrated {migrated_count} statistics entries "
                 f"from {old_entity_id} to {new_entity_id}. "
                 f"Old sensor can be deleted manually if desired."
             )
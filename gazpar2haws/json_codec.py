@@ -0,0 +1,60 @@
+"""JSON codecs used to encode and decode the Home Assistant websocket messages."""
+
+import json
+from typing import Any
+
+try:
+    import orjson  # type: ignore[import-not-found, unused-ignore]
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment, unused-ignore]
+
+
+# ----------------------------------
+class JsonCodec:
+    """Standard library JSON codec (always available)."""
+
+    name = "json"
+
+    # ----------------------------------
+    def dumps(self, obj: Any) -> str | bytes:
+        return json.dumps(obj)
+
+    # ----------------------------------
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+# ----------------------------------
+class OrjsonCodec(JsonCodec):
+    """orjson codec: faster encoding/decoding, encodes to UTF-8 bytes and serializes numpy values natively."""
+
+    name = "orjson"
+
+    # ----------------------------------
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+
+    # ----------------------------------
+    def dumps(self, obj: Any) -> str | bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)  # pylint: disable=no-member
+
+    # ----------------------------------
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)  # pylint: disable=no-member
+
+
+# ----------------------------------
+# Return the codec with the given name: "json", "orjson", or "auto" (orjson if installed, json otherwise).
+def get_json_codec(name: str = "auto") -> JsonCodec:
+
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+
+    if name == "orjson":
+        return OrjsonCodec()
+
+    if name == "json":
+        return JsonCodec()
+
+    raise ValueError(f"Invalid JSON codec: {name} (expected values: auto, json, orjson)")
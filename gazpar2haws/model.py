@@ -4,10 +4,19 @@ from enum import Enum
 from pathlib import Path
 from typing import Generic, Optional, TypeVar
 
-from pydantic import BaseModel, ConfigDict, EmailStr, SecretStr, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    PrivateAttr,
+    SecretStr,
+    model_validator,
+)
 from pydantic_extra_types.timezone_name import TimeZoneName
 
 from gazpar2haws.date_array import DateArray
+from gazpar2haws.date_frame import DateFrame
+from gazpar2haws.scheduler import parse_scan_window
 
 
 # ----------------------------------
@@ -62,6 +71,10 @@ class Device(BaseModel):
     timezone: TimeZoneName = TimeZoneName("Europe/Paris")
     last_days: int = 365
     reset: bool = False
+    repair: bool = False  # If True, the sums in Home Assistant are checked and adjusted over the last days
+    fetch_timeout: float = 300.0  # Maximum time (in seconds) of a GrDF data retrieval
+    readings_cache_file: Optional[str] = None  # SQLite file caching the GrDF daily readings (None: no cache)
+    publication_gate: bool = True  # If True, GrDF is not called before the next daily reading is expected
 
     @model_validator(mode="after")
     def validate_properties(self):
@@ -88,8 +101,22 @@ class Device(BaseModel):
 # ----------------------------------
 class Grdf(BaseModel):
     scan_interval: Optional[int] = 480
+    scan_max_interval: int = 1440  # Maximum number of minutes between scans of a device without new data
+    scan_jitter: int = 0  # Maximum random delay (in minutes) added to each scan
+    scan_windows: list[str] = []  # Allowed scan windows "HH:MM-HH:MM" (empty: any time)
+    max_concurrent_devices: int = 4  # Maximum number of devices published at the same time
     devices: list[Device]
 
+    @model_validator(mode="after")
+    def validate_properties(self):
+        if self.max_concurrent_devices < 1:
+            raise ValueError(f"Invalid max_concurrent_devices {self.max_concurrent_devices} (expected value >= 1)")
+        if self.scan_jitter < 0:
+            raise ValueError(f"Invalid scan_jitter {self.scan_jitter} (expected value >= 0)")
+        for scan_window in self.scan_windows:
+            parse_scan_window(scan_window)
+        return self
+
 
 # ----------------------------------
 class HomeAssistant(BaseModel):
@@ -97,6 +124,18 @@ class HomeAssistant(BaseModel):
     port: int
     endpoint: str = "/api/websocket"
     token: SecretStr
+    reconnect_max_attempts: int = 5
+    reconnect_delay: float = 1.0  # Initial delay (in seconds) before reconnecting, doubled at each attempt
+    reconnect_max_delay: float = 60.0
+    statistic_ids_ttl: float = 300.0  # Time (in seconds) the list of existing statistic ids is kept in cache
+    json_codec: str = "auto"  # auto | json | orjson
+    outbox_file: Optional[str] = None  # SQLite file keeping the statistics until imported (None: no outbox)
+
+    @model_validator(mode="after")
+    def validate_properties(self):
+        if self.json_codec not in ["auto", "json", "orjson"]:
+            raise ValueError(f"Invalid json_codec {self.json_codec} (expected values: auto, json, orjson)")
+        return self
 
 
 # ----------------------------------
@@ -327,11 +366,22 @@ class CostBreakdown(BaseModel):
     The 'total' field contains the sum of all component costs.
     All other fields are individual component costs (e.g., consumption_prices_cost,
     subscription_prices_cost, my_custom_tax_cost, etc.).
+    The date frame holding all the costs as rows (the cost arrays are views of its rows) is private, so that it
+    does not collide with a component name.
     """
 
     model_config = ConfigDict(extra="allow")
 
     total: CostArray
+    _cost_frame: Optional[DateFrame] = PrivateAttr(default=None)
+
+    def get_cost_frame(self) -> Optional[DateFrame]:
+        """Get the date frame holding all the costs as rows, if the costs are views of its rows."""
+        return self._cost_frame
+
+    def set_cost_frame(self, cost_frame: DateFrame):
+        """Set the date frame whose rows are the component costs and the total."""
+        self._cost_frame = cost_frame
 
     def get_component_costs(self) -> dict[str, CostArray]:
         """Get all component cost arrays (all fields except 'total')."""
@@ -351,6 +401,10 @@ class CostBreakdown(BaseModel):
         Maps legacy names (consumption, subscription, transport, energy_taxes)
         to their corresponding component names (consumption_prices, etc.).
         """
+        # Private attributes are resolved by pydantic
+        if name.startswith("_"):
+            return super().__getattr__(name)  # type: ignore[misc]
+
         # Legacy name mapping
         legacy_map = {
             "consumption": "consumption_prices",
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+Logger = logging.getLogger(__name__)
+
+
+# ----------------------------------
+class PipelineStageStats:
+    """Activity of a pipeline stage: processed and failed items, time spent in the handler, input queue depth."""
+
+    # ----------------------------------
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.max_queue_depth = 0
+
+    # ----------------------------------
+    # Items processed per second of handler time (0 if nothing has been processed yet).
+    def throughput(self) -> float:
+
+        if self.busy_time == 0.0:
+            return 0.0
+
+        return self.processed / self.busy_time
+
+    # ----------------------------------
+    def reset(self):
+
+        self.processed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.max_queue_depth = 0
+
+    # ----------------------------------
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.processed} processed, {self.failed} failed, {self.busy_time:.2f}s busy, "
+            f"{self.throughput():.2f} items/s, max queue depth {self.max_queue_depth}"
+        )
+
+
+# ----------------------------------
+class PipelineStage:  # pylint: disable=too-few-public-methods
+    """
+    One stage of a pipeline: a handler run by a fixed number of workers on the items of its input queue.
+
+    The input queue is bounded, so that a slow stage applies back-pressure to the previous one instead of
+    letting items pile up in memory.
+    """
+
+    # ----------------------------------
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int = 1, queue_size: int = 1):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.stats = PipelineStageStats(name)
+
+
+# ----------------------------------
+class Pipeline:
+    """
+    Run items through a sequence of stages connected by bounded queues.
+
+    Each stage processes an item as soon as the previous stage is done with it, so that different items are in
+    different stages at the same time (e.g. one item downloaded while another one is published).
+    An item whose handler raises an exception is dropped from the following stages: its result is the exception,
+    and the other items are not affected.
+    """
+
+    # ----------------------------------
+    def __init__(self, stages: list[PipelineStage]):
+
+        if len(stages) == 0:
+            raise ValueError("A pipeline requires at least one stage")
+
+        self._stages = stages
+
+    # ----------------------------------
+    def stats(self) -> list[PipelineStageStats]:
+        return [stage.stats for stage in self._stages]
+
+    # ----------------------------------
+    # Run the items through all the stages and return, in order, the result of the last stage for each item
+    # (or the exception raised by the stage that failed on it).
+    async def run(self, items: list[Any]) -> list[Any]:
+
+        for stage in self._stages:
+            stage.stats.reset()
+
+        queues = [asyncio.Queue[tuple[int, Any]](maxsize=stage.queue_size) for stage in self._stages]
+        results: list[Any] = [None] * len(items)
+
+        workers = [
+            asyncio.create_task(self._work(stage_index, queues, results))
+            for stage_index, stage in enumerate(self._stages)
+            for _ in range(stage.workers)
+        ]
+
+        try:
+            for item_index, item in enumerate(items):
+                await self._put(0, queues, (item_index, item))
+
+            # An item is forwarded to the next queue before being marked done, so joining the queues in order
+            # waits for all the items to go through all the stages.
+            for queue in queues:
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return results
+
+    # ----------------------------------
+    async def _put(self, stage_index: int, queues: list[asyncio.Queue], entry: tuple[int, Any]):
+
+        await queues[stage_index].put(entry)
+
+        stats = self._stages[stage_index].stats
+        stats.max_queue_depth = max(stats.max_queue_depth, queues[stage_index].qsize())
+
+    # ----------------------------------
+    async def _work(self, stage_index: int, queues: list[asyncio.Queue], results: list[Any]):
+
+        stage = self._stages[stage_index]
+
+        while True:
+            item_index, item = await queues[stage_index].get()
+            try:
+                start_time = time.monotonic()
+                try:
+                    result = await stage.handler(item)
+                finally:
+                    stage.stats.busy_time += time.monotonic() - start_time
+            except Exception as exc:  # pylint: disable=broad-except
+                Logger.debug(f"Pipeline stage '{stage.name}' failed on item {item_index}: {exc}")
+                stage.stats.failed += 1
+                results[item_index] = exc
+            else:
+                stage.stats.processed += 1
+                if stage_index + 1 < len(self._stages):
+                    await self._put(stage_index + 1, queues, (item_index, result))
+                else:
+                    results[item_index] = result
+            finally:
+                queues[stage_index].task_done()
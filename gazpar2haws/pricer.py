@@ -2,7 +2,10 @@ import calendar
 from datetime import date, timedelta
 from typing import Callable, Optional, Tuple, overload
 
-from gazpar2haws.date_array import DateArray
+import numpy as np
+
+from gazpar2haws.date_array import DateArray, date_range
+from gazpar2haws.date_frame import DateFrame
 from gazpar2haws.model import (
     BaseUnit,
     CompositePriceArray,
@@ -72,12 +75,21 @@ class Pricer:
 
         # Process all pricing components dynamically
         components = self._pricing.get_components()
-        component_costs = {}
-        total_cost_array = None
+
+        # The costs of all the components and their total are rows of a single date frame.
+        cost_frame = DateFrame(
+            start_date=start_date,
+            end_date=end_date,
+            columns=[f"{component_name}_cost" for component_name in components] + ["total_cost"],
+        )
+
+        # Quantity (€/kWh) and time (€/day) prices of each component, filled straight into the rows of two date frames
+        quantity_price_frame = DateFrame(start_date=start_date, end_date=end_date, columns=list(components))
+        time_price_frame = DateFrame(start_date=start_date, end_date=end_date, columns=list(components))
 
         for component_name, composite_prices in components.items():
-            # Get composite price array for this component
-            composite_array = self.get_composite_price_array(
+            # Fill the composite price arrays of this component (rows of the price frames)
+            self.get_composite_price_array(
                 start_date=start_date,
                 end_date=end_date,
                 composite_prices=composite_prices,
@@ -85,41 +97,43 @@ class Pricer:
                 target_price_unit=price_unit,
                 target_quantity_unit=quantities.value_unit,
                 target_time_unit=quantities.base_unit,
+                quantity_value_array=quantity_price_frame[component_name],
+                time_value_array=time_price_frame[component_name],
             )
 
-            # Calculate cost for this component
-            component_cost = CostArray(
+        # Cost of every component (quantity * quantity price + time price) and total, in one matrix operation each
+        component_cost_matrix = cost_frame.matrix[:-1]
+        np.multiply(quantity_price_frame.matrix, quantity_array.array, out=component_cost_matrix)  # type: ignore[arg-type]
+        np.add(component_cost_matrix, time_price_frame.matrix, out=component_cost_matrix)
+        np.sum(component_cost_matrix, axis=0, out=cost_frame.matrix[-1])
+
+        # The cost arrays are views of the date frame rows.
+        component_costs = {
+            component_name: CostArray(
                 name=f"{component_name}_cost",
                 start_date=start_date,
                 end_date=end_date,
                 value_unit=price_unit,
                 base_unit=quantities.base_unit,
+                value_array=cost_frame[f"{component_name}_cost"],
             )
-            component_cost.value_array = (
-                quantity_array * composite_array.quantity_value_array  # type: ignore
-                + composite_array.time_value_array  # type: ignore
-            )
-
-            component_costs[component_name] = component_cost
-
-            # Accumulate to total
-            if total_cost_array is None:
-                total_cost_array = component_cost.value_array.copy()  # type: ignore
-            else:
-                total_cost_array = total_cost_array + component_cost.value_array  # type: ignore
+            for component_name in components
+        }
 
-        # Create total cost array
         total_cost = CostArray(
             name="total_cost",
             start_date=start_date,
             end_date=end_date,
             value_unit=price_unit,
             base_unit=quantities.base_unit,
+            value_array=cost_frame["total_cost"],
         )
-        total_cost.value_array = total_cost_array
 
         # Return detailed breakdown with total and all component costs as extra fields
-        return CostBreakdown(total=total_cost, **component_costs)
+        cost_breakdown = CostBreakdown(total=total_cost, **component_costs)
+        cost_breakdown.set_cost_frame(cost_frame)
+
+        return cost_breakdown
 
     # ----------------------------------
     @classmethod
@@ -154,6 +168,8 @@ class Pricer:
         target_price_unit: PriceUnit,
         target_quantity_unit: QuantityUnit,
         target_time_unit: TimeUnit,
+        quantity_value_array: Optional[DateArray] = None,
+        time_value_array: Optional[DateArray] = None,
     ) -> CompositePriceArray:
 
         if composite_prices is None or len(composite_prices) == 0:
@@ -175,6 +191,8 @@ class Pricer:
             quantity_unit=target_quantity_unit,
             time_unit=target_time_unit,
             vat_id=first_composite_price.vat_id,
+            quantity_value_array=quantity_value_array,
+            time_value_array=time_value_array,
         )
 
         # Fill the quantity component array (if present in the composite prices)
@@ -230,10 +248,7 @@ class Pricer:
             for value in in_values:
                 latest_start = max(value.start_date, start_date)
                 earliest_end = min(value.end_date if value.end_date is not None else end_date, end_date)
-                current_date = latest_start
-                while current_date <= earliest_end:
-                    value_array[current_date] = value.value
-                    current_date += timedelta(days=1)
+                value_array.set_many(date_range(latest_start, earliest_end), value.value)
 
     # ----------------------------------
     @classmethod
@@ -301,14 +316,12 @@ class Pricer:
             for value in in_values:
                 latest_start = max(value.start_date, start_date)
                 earliest_end = min(value.end_date if value.end_date is not None else end_date, end_date)
-                current_date = latest_start
-                while current_date <= earliest_end:
-                    if vat_rate_array_by_id is not None and value.vat_id in vat_rate_array_by_id:
-                        vat_value = vat_rate_array_by_id[value.vat_id].value_array[current_date]  # type: ignore
-                    else:
-                        vat_value = 0.0
-                    value_array[current_date] = (vat_value + 1) * value.value  # type: ignore
-                    current_date += timedelta(days=1)
+                dates = date_range(latest_start, earliest_end)
+                if vat_rate_array_by_id is not None and value.vat_id in vat_rate_array_by_id:
+                    vat_value = vat_rate_array_by_id[value.vat_id].value_array.get_many(dates)  # type: ignore
+                else:
+                    vat_value = 0.0
+                value_array.set_many(dates, (vat_value + 1) * value.value)  # type: ignore
 
     # ----------------------------------
     @classmethod
@@ -388,14 +401,12 @@ class Pricer:
                 if component_value is not None:
                     latest_start = max(value.start_date, start_date)
                     earliest_end = min(value.end_date if value.end_date is not None else end_date, end_date)
-                    current_date = latest_start
-                    while current_date <= earliest_end:
-                        if vat_rate_array_by_id is not None and value.vat_id in vat_rate_array_by_id:
-                            vat_value = vat_rate_array_by_id[value.vat_id].value_array[current_date]  # type: ignore
-                        else:
-                            vat_value = 0.0
-                        component_array[current_date] = (vat_value + 1) * component_value  # type: ignore
-                        current_date += timedelta(days=1)
+                    dates = date_range(latest_start, earliest_end)
+                    if vat_rate_array_by_id is not None and value.vat_id in vat_rate_array_by_id:
+                        vat_value = vat_rate_array_by_id[value.vat_id].value_array.get_many(dates)  # type: ignore
+                    else:
+                        vat_value = 0.0
+                    component_array.set_many(dates, (vat_value + 1) * component_value)  # type: ignore
 
     # ----------------------------------
     @classmethod
@@ -0,0 +1,51 @@
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+
+# ----------------------------------
+class PublicationGate:
+    """
+    Learn when GrDF usually publishes the daily reading of a meter, to avoid calling GrDF before it can have any.
+
+    GrDF publishes the reading of a day with a delay (typically one or more days, at some hour of the day).
+    Each time a fetch brings a new last reading, the delay (in days) and the hour of the fetch are recorded: they
+    are an upper bound of the actual publication time. The earliest recent observation is then used to tell
+    whether the next reading can already be there. Until enough observations are recorded, the gate is always open.
+    """
+
+    # ----------------------------------
+    def __init__(self, history_size: int = 14, min_observations: int = 2):
+        self._observations = deque[tuple[int, int]](maxlen=history_size)  # (publication delay in days, hour)
+        self._min_observations = min_observations
+
+    # ----------------------------------
+    # Return the (local) time from which the reading of the given date is expected to be published, or None if
+    # the publication time is not learned yet.
+    def expected_publication_time(self, reading_date: date) -> Optional[datetime]:
+
+        if len(self._observations) < self._min_observations:
+            return None
+
+        delay_days = min(delay for delay, _ in self._observations)
+        hour = min(hour for delay, hour in self._observations if delay == delay_days)
+
+        return datetime.combine(reading_date + timedelta(days=delay_days), time(hour=hour))
+
+    # ----------------------------------
+    # Tell whether GrDF may have a reading after last_known_date at the given (local) time.
+    def is_open(self, last_known_date: date, now: datetime) -> bool:
+
+        expected_time = self.expected_publication_time(last_known_date + timedelta(days=1))
+
+        return expected_time is None or now >= expected_time
+
+    # ----------------------------------
+    # Record the result of a fetch made at the given (local) time: if it brought a reading after last_known_date,
+    # the reading of last_reading_date was published at this time at the latest.
+    def record(self, last_known_date: date, last_reading_date: Optional[date], fetch_time: datetime):
+
+        if last_reading_date is None or last_reading_date <= last_known_date:
+            return
+
+        self._observations.append(((fetch_time.date() - last_reading_date).days, fetch_time.hour))
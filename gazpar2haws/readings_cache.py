@@ -0,0 +1,105 @@
+import json
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+import pygazpar  # type: ignore
+from pygazpar.datasource import MeterReadings  # type: ignore
+
+
+# ----------------------------------
+class ReadingsCache:
+    """
+    On-disk store (SQLite) of the GrDF daily readings, keyed by PCE identifier and date.
+
+    The days of a range fetched from GrDF are recorded up to its last reading, including the days without any
+    reading, so that a known day is never asked again. The days after the last reading stay unknown, because GrDF
+    may publish them late. Only the days of the last finalization_days are fetched again, because GrDF may still
+    publish or correct them.
+    """
+
+    # ----------------------------------
+    def __init__(self, file_path: str, finalization_days: int = 7):
+        self._file_path = file_path
+        self._finalization_days = finalization_days
+
+        with closing(sqlite3.connect(self._file_path)) as connection:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS daily_readings ("
+                    "pce_identifier TEXT NOT NULL, "
+                    "reading_date TEXT NOT NULL, "
+                    "reading TEXT, "
+                    "PRIMARY KEY (pce_identifier, reading_date))"
+                )
+
+    # ----------------------------------
+    # Return the known days between start_date and end_date: the reading of the day, or None if GrDF had none.
+    def load(self, pce_identifier: str, start_date: date, end_date: date) -> dict[date, Optional[dict[str, Any]]]:
+
+        with closing(sqlite3.connect(self._file_path)) as connection:
+            rows = connection.execute(
+                "SELECT reading_date, reading FROM daily_readings "
+                "WHERE pce_identifier = ? AND reading_date BETWEEN ? AND ? ORDER BY reading_date",
+                (pce_identifier, start_date.isoformat(), end_date.isoformat()),
+            ).fetchall()
+
+        return {
+            date.fromisoformat(reading_date): json.loads(reading) if reading is not None else None
+            for reading_date, reading in rows
+        }
+
+    # ----------------------------------
+    # Record the days between start_date and the last given reading: the given readings, and the other days as
+    # empty. The days after the last reading are not recorded, so that they are fetched again.
+    def store(self, pce_identifier: str, start_date: date, end_date: date, readings: MeterReadings):
+
+        readings_in_range = dict[date, dict[str, Any]]()
+
+        for reading in readings:
+            reading_date = datetime.strptime(reading[pygazpar.PropertyName.TIME_PERIOD.value], "%d/%m/%Y").date()
+            if start_date <= reading_date <= end_date:
+                readings_in_range[reading_date] = reading
+
+        if len(readings_in_range) == 0:
+            return
+
+        reading_by_date = dict[date, Optional[dict[str, Any]]]()
+
+        current_date = start_date
+        while current_date <= max(readings_in_range):
+            reading_by_date[current_date] = readings_in_range.get(current_date)
+            current_date += timedelta(days=1)
+
+        with closing(sqlite3.connect(self._file_path)) as connection:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO daily_readings (pce_identifier, reading_date, reading) VALUES (?, ?, ?)",
+                    [
+                        (
+                            pce_identifier,
+                            reading_date.isoformat(),
+                            json.dumps(reading, default=str) if reading is not None else None,
+                        )
+                        for reading_date, reading in reading_by_date.items()
+                    ],
+                )
+
+    # ----------------------------------
+    # Return the first day between start_date and end_date that must be fetched from GrDF (unknown, or recent
+    # enough to be still updated by GrDF), or None if all the days are known and final.
+    # as_of_date is the current date of the device (in its timezone), from which the recent days are counted.
+    def first_date_to_fetch(
+        self, known_days: dict[date, Optional[dict[str, Any]]], start_date: date, end_date: date, as_of_date: date
+    ) -> Optional[date]:
+
+        finalized_date = as_of_date - timedelta(days=self._finalization_days)
+
+        current_date = start_date
+        while current_date <= end_date:
+            if current_date not in known_days or current_date > finalized_date:
+                return current_date
+            current_date += timedelta(days=1)
+
+        return None
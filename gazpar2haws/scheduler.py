@@ -0,0 +1,134 @@
+import heapq
+import itertools
+import random
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+
+# ----------------------------------
+# Parse a scan window formatted as "HH:MM-HH:MM" (the end may be before the start for a window spanning midnight).
+def parse_scan_window(window: str) -> tuple[time, time]:
+
+    try:
+        start, end = window.split("-")
+        return time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+    except ValueError as exc:
+        raise ValueError(f"Invalid scan window '{window}' (expected format: HH:MM-HH:MM)") from exc
+
+
+# ----------------------------------
+class ScanScheduler:
+    """
+    Scan schedule of the devices: a priority queue of the next scan time of each device.
+
+    After a scan that published new data, a device is scanned again after the scan interval. After a scan without
+    new data, its interval is doubled up to max_interval, and reset as soon as new data is published again.
+    When the time of the next GrDF publication is known (see PublicationGate), the device is scanned at that time
+    if it comes first, so that the scans gather around the publication times instead of being evenly spread.
+    A random jitter is added to each scan time, and scans are moved to the next allowed window if any.
+    """
+
+    # ----------------------------------
+    def __init__(
+        self,
+        interval: timedelta,
+        max_interval: Optional[timedelta] = None,
+        jitter: timedelta = timedelta(0),
+        windows: Optional[list[tuple[time, time]]] = None,
+    ):
+        self._interval = interval
+        self._max_interval = max(max_interval, interval) if max_interval is not None else interval
+        self._jitter = jitter
+        self._windows = windows if windows is not None else []
+
+        self._queue = list[tuple[datetime, int, str]]()
+        self._counter = itertools.count()  # Tie-breaker: devices due at the same time keep their order
+        self._intervals = dict[str, timedelta]()
+
+    # ----------------------------------
+    # Schedule the scan of a device at the given time, or at the start of the next allowed window.
+    # Return the scheduled time.
+    def schedule(self, name: str, run_time: datetime) -> datetime:
+
+        self._intervals.setdefault(name, self._interval)
+
+        run_time = self._in_window(run_time)
+        heapq.heappush(self._queue, (run_time, next(self._counter), name))
+
+        return run_time
+
+    # ----------------------------------
+    # Time of the next scan, or None if no device is scheduled.
+    def next_run_time(self) -> Optional[datetime]:
+
+        if len(self._queue) == 0:
+            return None
+
+        return self._queue[0][0]
+
+    # ----------------------------------
+    # Move all the scheduled scans to the given time at the latest (e.g. on a scan request), keeping their order.
+    def advance_all(self, now: datetime):
+
+        self._queue = [(min(run_time, now), counter, name) for run_time, counter, name in self._queue]
+        heapq.heapify(self._queue)
+
+    # ----------------------------------
+    # Remove and return the devices due at the given time, in scheduled order.
+    def pop_due(self, now: datetime) -> list[str]:
+
+        names = list[str]()
+        while len(self._queue) > 0 and self._queue[0][0] <= now:
+            names.append(heapq.heappop(self._queue)[2])
+
+        return names
+
+    # ----------------------------------
+    # Schedule the next scan of a device after a scan ending at the given time: published tells whether new data
+    # was published (None if the scan failed, which leaves the interval unchanged), and publication_time is the
+    # expected time of the next GrDF publication, if known. Return the time of the next scan.
+    def reschedule(
+        self, name: str, now: datetime, published: Optional[bool], publication_time: Optional[datetime] = None
+    ) -> datetime:
+
+        interval = self._intervals.get(name, self._interval)
+        if published is True:
+            interval = self._interval
+        elif published is False:
+            interval = min(interval * 2, self._max_interval)
+        self._intervals[name] = interval
+
+        run_time = now + interval
+        if publication_time is not None and now < publication_time < run_time:
+            run_time = publication_time.astimezone(now.tzinfo)
+
+        if self._jitter > timedelta(0):
+            run_time += timedelta(seconds=random.uniform(0, self._jitter.total_seconds()))
+
+        return self.schedule(name, run_time)
+
+    # ----------------------------------
+    # Return the given time if it is inside an allowed window (or if no window is configured), the start of the
+    # next allowed window otherwise. Windows are in the local time of the given datetime.
+    def _in_window(self, run_time: datetime) -> datetime:
+
+        if len(self._windows) == 0:
+            return run_time
+
+        time_of_day = run_time.time().replace(tzinfo=None)
+
+        window_starts = list[datetime]()
+        for start, end in self._windows:
+            if start <= end:
+                inside = start <= time_of_day < end
+            else:
+                inside = time_of_day >= start or time_of_day < end
+            if inside:
+                return run_time
+
+            for day in range(2):
+                window_start = datetime.combine(run_time.date() + timedelta(days=day), start, tzinfo=run_time.tzinfo)
+                if window_start > run_time:
+                    window_starts.append(window_start)
+
+        return min(window_starts)
@@ -0,0 +1,137 @@
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+# ----------------------------------
+# Statistics of a sensor to import to Home Assistant.
+class SensorStatistics(BaseModel):
+    entity_id: str
+    source: str
+    name: str
+    unit_class: Optional[str]
+    unit_of_measurement: str
+    statistics: list[dict[str, Any]]
+
+
+# ----------------------------------
+# Statistics of a sensor to import to Home Assistant, as stored in the outbox.
+class StatisticsBatch(SensorStatistics):
+    batch_id: int
+
+
+# ----------------------------------
+class StatisticsOutbox:
+    """
+    On-disk queue (SQLite) of the statistics batches to import to Home Assistant.
+
+    A batch is added before being sent and acknowledged (removed) once Home Assistant has imported it. The batches
+    left after a failure (e.g. Home Assistant restarting, or Gazpar2HAWS stopped in the middle of an import) are
+    replayed in order when the connection is back, without fetching GrDF or computing the costs again.
+    """
+
+    # ----------------------------------
+    def __init__(self, file_path: str):
+        self._file_path = file_path
+
+        with closing(sqlite3.connect(self._file_path)) as connection:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS statistics_batches ("
+                    "batch_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    "created_at TEXT NOT NULL, "
+                    "entity_id TEXT NOT NULL, "
+                    "source TEXT NOT NULL, "
+                    "name TEXT NOT NULL, "
+                    "unit_class TEXT, "
+                    "unit_of_measurement TEXT NOT NULL, "
+                    "statistics TEXT NOT NULL)"
+                )
+
+    # ----------------------------------
+    # Add a batch and return its identifier.
+    def add(
+        self,
+        entity_id: str,
+        source: str,
+        name: str,
+        unit_class: Optional[str],
+        unit_of_measurement: str,
+        statistics: list[dict[str, Any]],
+    ) -> int:
+
+        return self.add_many(
+            [
+                SensorStatistics(
+                    entity_id=entity_id,
+                    source=source,
+                    name=name,
+                    unit_class=unit_class,
+                    unit_of_measurement=unit_of_measurement,
+                    statistics=statistics,
+                )
+            ]
+        )[0]
+
+    # ----------------------------------
+    # Add several batches in a single transaction (all or none) and return their identifiers, in the same order.
+    def add_many(self, sensor_statistics: list[SensorStatistics]) -> list[int]:
+
+        created_at = datetime.now().isoformat()
+        batch_ids = list[int]()
+
+        with closing(sqlite3.connect(self._file_path)) as connection:
+            with connection:
+                for sensor in sensor_statistics:
+                    cursor = connection.execute(
+                        "INSERT INTO statistics_batches "
+                        "(created_at, entity_id, source, name, unit_class, unit_of_measurement, statistics) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            created_at,
+                            sensor.entity_id,
+                            sensor.source,
+                            sensor.name,
+                            sensor.unit_class,
+                            sensor.unit_of_measurement,
+                            json.dumps(sensor.statistics, default=float),
+                        ),
+                    )
+                    batch_ids.append(int(cursor.lastrowid))  # type: ignore[arg-type]
+
+        return batch_ids
+
+    # ----------------------------------
+    # Remove a batch imported by Home Assistant.
+    def acknowledge(self, batch_id: int):
+
+        with closing(sqlite3.connect(self._file_path)) as connection:
+            with connection:
+                connection.execute("DELETE FROM statistics_batches WHERE batch_id = ?", (batch_id,))
+
+    # ----------------------------------
+    # Return the batches not acknowledged yet, oldest first.
+    def pending(self) -> list[StatisticsBatch]:
+
+        with closing(sqlite3.connect(self._file_path)) as connection:
+            rows = connection.execute(
+                "SELECT batch_id, entity_id, source, name, unit_class, unit_of_measurement, statistics "
+                "FROM statistics_batches ORDER BY batch_id"
+            ).fetchall()
+
+        return [
+            StatisticsBatch(
+                batch_id=batch_id,
+                entity_id=entity_id,
+                source=source,
+                name=name,
+                unit_class=unit_class,
+                unit_of_measurement=unit_of_measurement,
+                statistics=json.loads(statistics),
+            )
+            for batch_id, entity_id, source, name, unit_class, unit_of_measurement, statistics in rows
+        ]
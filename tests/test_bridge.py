@@ -1,5 +1,8 @@
 """Test the bridge module."""
 
+import asyncio
+import time
+
 import pytest
 
 from gazpar2haws.bridge import Bridge
@@ -16,3 +19,136 @@ async def test_run():
 
     bridge = Bridge(config)
     await bridge.run()
+
+
+# ----------------------------------
+# @pytest.mark.skip(reason="Requires Home Assistant server")
+@pytest.mark.asyncio
+async def test_run_isolates_device_errors():
+
+    # Load configuration
+    config = Configuration.load("tests/config/configuration.yaml", "tests/config/secrets.yaml")  # pylint: disable=W0201
+
+    # Two devices: the first one fails, the second one must be published anyway
+    config.grdf.devices.append(config.grdf.devices[0].model_copy(update={"name": "gazpar2haws_other"}))
+
+    bridge = Bridge(config)
+
+    published = []
+
+    async def failing_fetch():
+        raise RuntimeError("GrDF is down")
+
+    async def publish_statistics(
+        publications,
+        gazpar=bridge._gazpar[1],  # pylint: disable=W0212
+        original_publish_statistics=bridge._gazpar[1].publish_statistics,  # pylint: disable=W0212
+    ):
+        await original_publish_statistics(publications)
+        published.append(gazpar.name())
+
+    bridge._gazpar[0].fetch = failing_fetch  # pylint: disable=W0212
+    bridge._gazpar[1].publish_statistics = publish_statistics  # pylint: disable=W0212
+
+    await bridge.run()
+
+    assert published == ["gazpar2haws_other"]
+
+
+# ----------------------------------
+# @pytest.mark.skip(reason="Requires Home Assistant server")
+@pytest.mark.asyncio
+async def test_run_scan_request_and_shutdown():
+
+    # Load configuration
+    config = Configuration.load("tests/config/configuration.yaml", "tests/config/secrets.yaml")  # pylint: disable=W0201
+
+    # Next scan in one hour
+    config.grdf.scan_interval = 60
+
+    bridge = Bridge(config)
+
+    scan_count = 0
+    original_run = bridge._pipeline.run  # pylint: disable=W0212
+
+    async def run(items):
+        nonlocal scan_count
+        results = await original_run(items)
+        scan_count += 1
+        return results
+
+    bridge._pipeline.run = run  # type: ignore[method-assign] # pylint: disable=W0212
+
+    async def wait_for_scan_count(count):
+        while scan_count < count:
+            await asyncio.sleep(0.01)
+
+    run_task = asyncio.create_task(bridge.run())
+
+    await asyncio.wait_for(wait_for_scan_count(1), timeout=30)
+
+    # A scan request wakes the bridge up immediately
+    bridge.request_scan()
+    await asyncio.wait_for(wait_for_scan_count(2), timeout=30)
+
+    # A shutdown request stops the bridge without waiting for the next scan
+    await asyncio.sleep(0.1)
+    start_time = time.monotonic()
+    bridge.request_shutdown()
+    await asyncio.wait_for(run_task, timeout=5)
+
+    assert time.monotonic() - start_time < 1
+    assert scan_count == 2
+
+
+# ----------------------------------
+# @pytest.mark.skip(reason="Requires Home Assistant server")
+@pytest.mark.asyncio
+async def test_run_survives_home_assistant_outage():
+
+    # Load configuration
+    config = Configuration.load("tests/config/configuration.yaml", "tests/config/secrets.yaml")  # pylint: disable=W0201
+
+    # Home Assistant is unreachable for longer than the reconnection attempts
+    port = config.homeassistant.port
+    config.homeassistant.port = 1
+    config.homeassistant.reconnect_max_attempts = 2
+    config.homeassistant.reconnect_delay = 0.01
+    config.homeassistant.reconnect_max_delay = 0.01
+    config.grdf.scan_interval = 60
+
+    bridge = Bridge(config)
+
+    scan_results = []
+    original_scan = bridge._scan  # pylint: disable=W0212
+
+    async def scan(due_gazpar):
+        results = await original_scan(due_gazpar)
+        scan_results.append(results)
+        return results
+
+    bridge._scan = scan  # type: ignore[method-assign] # pylint: disable=W0212
+
+    async def wait_for_scan_count(count):
+        while len(scan_results) < count:
+            await asyncio.sleep(0.01)
+
+    run_task = asyncio.create_task(bridge.run())
+
+    # The scan fails without stopping the bridge, and the device is scheduled again
+    await asyncio.wait_for(wait_for_scan_count(1), timeout=30)
+    await asyncio.sleep(0.1)
+
+    assert not run_task.done()
+    assert all(isinstance(result, Exception) for result in scan_results[0])
+    assert bridge._scheduler.next_run_time() is not None  # pylint: disable=W0212
+
+    # Home Assistant is back: the next scan succeeds
+    bridge._homeassistant._port = port  # pylint: disable=W0212
+    bridge.request_scan()
+    await asyncio.wait_for(wait_for_scan_count(2), timeout=30)
+
+    assert not any(isinstance(result, Exception) for result in scan_results[1])
+
+    bridge.request_shutdown()
+    await asyncio.wait_for(run_task, timeout=5)
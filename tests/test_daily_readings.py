@@ -0,0 +1,94 @@
+"""Test the daily_readings module."""
+
+from datetime import date
+
+import pygazpar  # type: ignore
+
+from gazpar2haws.daily_readings import DailyReadings
+
+TIME_PERIOD = pygazpar.PropertyName.TIME_PERIOD.value
+VOLUME = pygazpar.PropertyName.VOLUME.value
+ENERGY = pygazpar.PropertyName.ENERGY.value
+
+
+# ----------------------------------
+def test_from_meter_readings():
+
+    readings = [
+        {TIME_PERIOD: "03/01/2021", VOLUME: 3.0, ENERGY: 33.0},
+        {TIME_PERIOD: "01/01/2021", VOLUME: 1.0, ENERGY: 11.0},
+        {TIME_PERIOD: "02/01/2021", VOLUME: None, ENERGY: 22.0},
+    ]
+
+    daily_readings = DailyReadings.from_meter_readings(readings, [VOLUME, ENERGY])
+
+    assert len(daily_readings) == 3
+    assert daily_readings.first_date() == date(2021, 1, 1)
+    assert daily_readings.last_date() == date(2021, 1, 3)
+    assert list(daily_readings.values[ENERGY]) == [11.0, 22.0, 33.0]
+    assert list(daily_readings.masks[VOLUME]) == [True, False, True]
+
+    selection = daily_readings.between(date(2021, 1, 2), date(2021, 1, 5))
+
+    assert len(selection) == 2
+    assert selection.first_date() == date(2021, 1, 2)
+
+
+# ----------------------------------
+def test_to_date_array():
+
+    readings = [
+        {TIME_PERIOD: "01/01/2021", VOLUME: 1.0, ENERGY: 11.0},
+        {TIME_PERIOD: "02/01/2021", VOLUME: None, ENERGY: 22.0},
+        {TIME_PERIOD: "04/01/2021", VOLUME: 4.0, ENERGY: 44.0},
+    ]
+
+    daily_readings = DailyReadings.from_meter_readings(readings, [VOLUME, ENERGY])
+
+    volume_array = daily_readings.to_date_array(VOLUME, date(2021, 1, 1), date(2021, 1, 5))
+
+    assert volume_array is not None
+    assert volume_array.start_date == date(2021, 1, 1)
+    assert list(volume_array.array) == [1.0, 0.0, 0.0, 4.0, 0.0]  # type: ignore[arg-type]
+
+    energy_array = daily_readings.to_date_array(ENERGY, date(2021, 1, 2), date(2021, 1, 3))
+
+    assert energy_array is not None
+    assert list(energy_array.array) == [22.0, 0.0]  # type: ignore[arg-type]
+
+    # No value in the range
+    assert daily_readings.to_date_array(VOLUME, date(2021, 1, 2), date(2021, 1, 3)) is None
+    assert DailyReadings.empty([VOLUME]).to_date_array(VOLUME, date(2021, 1, 1), date(2021, 1, 3)) is None
+
+
+# ----------------------------------
+def test_to_date_arrays():
+
+    readings = [
+        {TIME_PERIOD: "01/01/2021", VOLUME: 1.0, ENERGY: 11.0},
+        {TIME_PERIOD: "02/01/2021", VOLUME: None, ENERGY: 22.0},
+        {TIME_PERIOD: "04/01/2021", VOLUME: 4.0, ENERGY: 44.0},
+    ]
+
+    daily_readings = DailyReadings.from_meter_readings(readings, [VOLUME, ENERGY])
+
+    date_arrays, missing_days = daily_readings.to_date_arrays([VOLUME, ENERGY], date(2021, 1, 1), date(2021, 1, 5))
+
+    volume_array = date_arrays[VOLUME]
+    energy_array = date_arrays[ENERGY]
+
+    assert volume_array is not None and energy_array is not None
+    assert volume_array.is_aligned_with(energy_array)
+    assert list(volume_array.array) == [1.0, 0.0, 0.0, 4.0, 0.0]  # type: ignore[arg-type]
+    assert list(energy_array.array) == [11.0, 22.0, 0.0, 44.0, 0.0]  # type: ignore[arg-type]
+    assert list(missing_days) == [False, False, True, False, True]
+
+    # A property without any value in the range
+    date_arrays, missing_days = daily_readings.to_date_arrays([VOLUME, ENERGY], date(2021, 1, 2), date(2021, 1, 3))
+
+    assert date_arrays[VOLUME] is None
+    assert date_arrays[ENERGY] is not None
+    assert list(missing_days) == [False, True]
+
+    assert daily_readings.has_values(VOLUME, date(2021, 1, 2), date(2021, 1, 4))
+    assert not daily_readings.has_values(VOLUME, date(2021, 1, 2), date(2021, 1, 3))
@@ -2,7 +2,11 @@
 
 from datetime import date
 
-from gazpar2haws.date_array import DateArray
+import numpy as np
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from gazpar2haws.date_array import DateArray, date_range
 
 
 def test_date_array():
@@ -61,3 +65,134 @@ def test_slice():
     date_array_slice2 = date_array[date(2021, 1, 1) : date(2021, 1, 2)]
 
     assert len(date_array_slice2) == 1
+
+
+def test_in_place_and_multiply_add():
+
+    date_array = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31), initial_value=1)
+    factor = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31), initial_value=3)
+    array = date_array.array
+
+    date_array += factor
+    date_array *= 2
+    date_array -= 1
+    date_array /= factor
+
+    # Same object and same buffer
+    assert date_array.array is array
+    assert date_array[0] == (((1 + 3) * 2) - 1) / 3
+
+    # Fused multiply-add into a preallocated buffer
+    out = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31))
+    out_array = out.array
+
+    result = factor.multiply_add(factor, 0.5, out=out)
+
+    assert result is out and out.array is out_array
+    assert out[0] == 3 * 3 + 0.5
+
+    # Into a new date array
+    assert factor.multiply_add(2, factor)[30] == 3 * 2 + 3
+
+    with pytest.raises(ValueError):
+        factor.multiply_add(2, 1, out=DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 30)))
+
+    with pytest.raises(ValueError):
+        date_array += DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 30))
+
+
+def test_copy():
+
+    date_array = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31), initial_value=1)
+
+    date_array_copy = date_array.copy()
+    date_array_copy[0] = 2.0
+
+    assert date_array[0] == 1
+    assert date_array_copy.is_aligned_with(date_array)
+    assert date_array_copy.initial_value == 1.0
+
+
+def test_pydantic_field():
+
+    class Holder(BaseModel):
+        date_array: DateArray
+
+    date_array = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31))
+
+    # A DateArray is kept as is
+    assert Holder(date_array=date_array).date_array is date_array
+
+    # A dict is converted
+    holder = Holder(date_array={"start_date": date(2021, 1, 1), "end_date": date(2021, 1, 10), "initial_value": 2})
+
+    assert len(holder.date_array) == 10
+    assert holder.date_array[0] == 2.0
+
+    with pytest.raises(ValidationError):
+        Holder(date_array=[1.0, 2.0])  # type: ignore[arg-type]
+
+
+def test_iteration_and_records():
+
+    date_array = DateArray(
+        start_date=date(2021, 1, 30), end_date=date(2021, 2, 2), array=np.array([1.0, 2.0, 3.0, 4.0])
+    )
+
+    assert list(date_array) == [
+        (date(2021, 1, 30), 1.0),
+        (date(2021, 1, 31), 2.0),
+        (date(2021, 2, 1), 3.0),
+        (date(2021, 2, 2), 4.0),
+    ]
+
+    # Nested iterations have their own cursor
+    pairs = [(first, second) for first, _ in date_array for second, _ in date_array]
+    assert len(pairs) == 16
+
+    assert date_array.dates()[-1] == np.datetime64("2021-02-02")
+
+    records = date_array.to_records()
+    assert records["date"][2] == np.datetime64("2021-02-01")
+    assert records["value"].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_chunks():
+
+    date_array = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 10), initial_value=1)
+
+    chunks = list(date_array.chunks(4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert chunks[1].start_date == date(2021, 1, 5)
+    assert chunks[2].end_date == date(2021, 1, 10)
+
+    # Chunks are views of the date array
+    chunks[2][0] = 5.0
+    assert date_array[date(2021, 1, 9)] == 5.0
+
+    with pytest.raises(ValueError):
+        list(date_array.chunks(0))
+
+
+def test_get_many_and_set_many():
+
+    date_array = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31))
+
+    # Scatter a scalar and an array of values
+    date_array.set_many(date_range(date(2021, 1, 10), date(2021, 1, 12)), 2.0)
+    date_array.set_many([date(2021, 1, 1), date(2021, 1, 31)], np.array([1.0, 3.0]))
+
+    assert date_array.get_many([date(2021, 1, 1), date(2021, 1, 11), date(2021, 1, 31)]).tolist() == [1.0, 2.0, 3.0]
+    assert date_array.get_many(np.array(["2021-01-09", "2021-01-10"], dtype="datetime64[D]")).tolist() == [0.0, 2.0]
+    assert sum(value for _, value in date_array) == 10.0
+
+    # An empty range is a no-op
+    date_array.set_many(date_range(date(2021, 1, 5), date(2021, 1, 4)), 5.0)
+    assert date_array.get_many([]).tolist() == []
+
+    with pytest.raises(ValueError):
+        date_array.get_many([date(2020, 12, 31)])
+
+    with pytest.raises(ValueError):
+        date_array.set_many([date(2021, 2, 1)], 1.0)
@@ -0,0 +1,65 @@
+"""Test date_frame module."""
+
+from datetime import date
+
+import numpy as np
+import pytest
+from pydantic import BaseModel
+
+from gazpar2haws.date_array import DateArray
+from gazpar2haws.date_frame import DateFrame
+
+
+def test_date_frame():
+
+    date_frame = DateFrame(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31), columns=["volume", "energy"])
+
+    assert len(date_frame) == 31
+    assert date_frame.matrix.shape == (2, 31)
+    assert "energy" in date_frame
+    assert "cost" not in date_frame
+
+    # Columns are views of the matrix rows
+    energy = date_frame["energy"]
+    energy[date(2021, 1, 2)] = 10.0
+    assert date_frame.matrix[1, 1] == 10.0
+    assert np.shares_memory(energy.array, date_frame.matrix)
+
+    date_frame["volume"] = 1.0
+    date_frame["energy"] = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31), initial_value=2.0)
+    assert date_frame.matrix.sum() == 31 * 3.0
+
+    with pytest.raises(KeyError):
+        date_frame["cost"]  # pylint: disable=pointless-statement
+
+    with pytest.raises(ValueError):
+        date_frame["volume"] = DateArray(start_date=date(2021, 1, 1), end_date=date(2021, 1, 10))
+
+    with pytest.raises(ValueError):
+        DateFrame(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31), columns=["volume"], matrix=np.zeros((2, 31)))
+
+    # Column names are unique
+    with pytest.raises(ValueError, match="Duplicate column names"):
+        DateFrame(start_date=date(2021, 1, 1), end_date=date(2021, 1, 31), columns=["volume", "energy", "volume"])
+
+
+def test_cumsum():
+
+    date_frame = DateFrame(start_date=date(2021, 1, 1), end_date=date(2021, 1, 3), columns=["volume", "energy"])
+    date_frame.matrix[:] = [[1.0, 2.0, 3.0], [10.0, 20.0, 30.0]]
+
+    total_frame = date_frame.cumsum([100.0, 1000.0])
+
+    assert total_frame.columns == ["volume", "energy"]
+    assert total_frame["volume"].array.tolist() == [101.0, 103.0, 106.0]  # type: ignore[union-attr]
+    assert total_frame["energy"].array.tolist() == [1010.0, 1030.0, 1060.0]  # type: ignore[union-attr]
+
+
+def test_pydantic_field():
+
+    class Holder(BaseModel):
+        date_frame: DateFrame
+
+    holder = Holder(date_frame={"start_date": date(2021, 1, 1), "end_date": date(2021, 1, 10), "columns": ["a", "b"]})
+
+    assert holder.date_frame.matrix.shape == (2, 10)
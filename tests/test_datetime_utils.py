@@ -1,11 +1,13 @@
 """Unit tests for datetime utilities module."""
 
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
+import numpy as np
 import pytz
 
 from gazpar2haws.datetime_utils import (
     convert_statistics_timestamps,
+    local_midnight_iso_strings,
     timestamp_ms_to_date,
     timestamp_ms_to_datetime,
     timestamp_ms_to_iso_string,
@@ -305,3 +307,27 @@ class TestConvertStatisticsTimestamps:
         assert converted[0]["sum"] == 100.0
         assert converted[1]["sum"] == 200.0
         assert converted[2]["sum"] == 300.0
+
+
+class TestLocalMidnightIsoStrings:
+    """Test local_midnight_iso_strings function."""
+
+    def test_matches_localize_across_dst_changes(self):
+        """Test the offsets match pytz localize over years with DST changes."""
+        dates = np.datetime64("2020-01-01") + np.arange(3 * 366)
+
+        for timezone in ["Europe/Paris", "UTC", "America/Santiago", "Australia/Lord_Howe"]:
+            tz = pytz.timezone(timezone)
+            expected = [
+                tz.localize(datetime.combine(date(2020, 1, 1) + timedelta(days=day), datetime.min.time())).isoformat()
+                for day in range(len(dates))
+            ]
+
+            assert local_midnight_iso_strings(dates, timezone) == expected
+
+    def test_single_date_and_empty(self):
+        """Test with a single date and with no date."""
+        assert local_midnight_iso_strings(np.array(["2021-07-01"], dtype="datetime64[D]"), "Europe/Paris") == [
+            "2021-07-01T00:00:00+02:00"
+        ]
+        assert local_midnight_iso_strings(np.array([], dtype="datetime64[D]"), "Europe/Paris") == []
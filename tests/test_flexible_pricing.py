@@ -106,6 +106,34 @@ class TestFlexiblePricing:
             == component_costs["energy_taxes"].value_array[start_date]
         )
 
+    def test_component_named_like_a_cost_breakdown_attribute(self):
+        """Test that a component named 'frame' does not collide with the cost date frame."""
+        from gazpar2haws.model import Pricing
+
+        pricing = Pricing(
+            frame=[{"start_date": date(2023, 1, 1), "quantity_value": 0.1, "quantity_unit": "kWh", "price_unit": "€"}]
+        )
+
+        start_date = date(2023, 8, 20)
+        end_date = date(2023, 8, 25)
+
+        quantities = ConsumptionQuantityArray(
+            start_date=start_date,
+            end_date=end_date,
+            value_array=DateArray(start_date=start_date, end_date=end_date, initial_value=1.0),
+            value_unit=QuantityUnit.KWH,
+            base_unit=TimeUnit.DAY,
+        )
+
+        cost_breakdown = Pricer(pricing).compute(quantities, PriceUnit.EURO)
+
+        assert list(cost_breakdown.get_component_costs()) == ["frame"]
+        assert cost_breakdown.frame.value_array[start_date] == 0.1
+
+        cost_frame = cost_breakdown.get_cost_frame()
+        assert cost_frame is not None
+        assert cost_frame.columns == ["frame_cost", "total_cost"]
+
     def test_pricing_validation_requires_quantity_component(self):
         """Test that at least one quantity-based component is required."""
         from pydantic import ValidationError
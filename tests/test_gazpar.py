@@ -1,12 +1,16 @@
 """Test gazpar module."""
 
-from datetime import date
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 
 import pygazpar  # type: ignore
 import pytest
+import pytz
 
 from gazpar2haws.configuration import Configuration
-from gazpar2haws.gazpar import Gazpar
+from gazpar2haws.gazpar import Gazpar, GazparReadings
 from gazpar2haws.haws import HomeAssistantWS
 from gazpar2haws.model import (
     ConsumptionQuantityArray,
@@ -65,6 +69,155 @@ class TestGazpar:
 
         assert daily_history is not None and len(daily_history) > 0
 
+    # ----------------------------------
+    def test_fetch_daily_gazpar_history_with_cache(self, tmp_path):
+
+        device_config = self._grdf_device_config.model_copy(
+            update={"readings_cache_file": str(tmp_path / "readings.db")}
+        )
+
+        gazpar = Gazpar(device_config, self._pricing_config, self._haws)
+
+        start_date = date(2019, 6, 1)
+        end_date = date(2019, 6, 30)
+
+        daily_history = gazpar.fetch_daily_gazpar_history(start_date, end_date)
+
+        assert len(daily_history) > 0
+
+        # The second time, the readings are served by the local cache without asking GrDF
+        def failing_fetch_grdf_daily_readings(start_date, end_date):
+            raise RuntimeError("GrDF must not be called")
+
+        gazpar._fetch_grdf_daily_readings = failing_fetch_grdf_daily_readings  # type: ignore # pylint: disable=W0212
+
+        cached_daily_history = gazpar.fetch_daily_gazpar_history(start_date, end_date)
+
+        assert list(cached_daily_history.dates) == list(daily_history.dates)
+        assert list(cached_daily_history.values[pygazpar.PropertyName.ENERGY.value]) == list(
+            daily_history.values[pygazpar.PropertyName.ENERGY.value]
+        )
+
+    # ----------------------------------
+    @pytest.mark.asyncio
+    async def test_async_fetch_daily_gazpar_history(self):
+
+        gazpar = Gazpar(self._grdf_device_config, self._pricing_config, self._haws)
+
+        fetch_daily_gazpar_history = gazpar.fetch_daily_gazpar_history
+
+        # Simulate a slow GrDF download: the event loop must keep running meanwhile
+        def slow_fetch_daily_gazpar_history(start_date, end_date):
+            time.sleep(0.5)
+            return fetch_daily_gazpar_history(start_date, end_date)
+
+        gazpar.fetch_daily_gazpar_history = slow_fetch_daily_gazpar_history  # type: ignore[method-assign]
+
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        tick_task = asyncio.create_task(tick())
+        daily_history = await gazpar.async_fetch_daily_gazpar_history(date(2019, 6, 1), date(2019, 6, 30))
+        tick_task.cancel()
+
+        assert daily_history is not None and len(daily_history) > 0
+        assert ticks >= 5
+
+        # The fetch is abandoned after the timeout, and tracked until its worker thread completes
+        gazpar._fetch_timeout = 0.1  # pylint: disable=W0212
+
+        daily_history = await gazpar.async_fetch_daily_gazpar_history(date(2019, 6, 1), date(2019, 6, 30))
+
+        assert len(daily_history) == 0
+        assert len(gazpar._abandoned_fetches) == 1  # pylint: disable=W0212
+
+        # No new fetch is started while the abandoned one is running
+        gazpar.fetch_daily_gazpar_history = fetch_daily_gazpar_history  # type: ignore[method-assign]
+        gazpar._fetch_timeout = 10.0  # pylint: disable=W0212
+
+        assert len(await gazpar.async_fetch_daily_gazpar_history(date(2019, 6, 1), date(2019, 6, 30))) == 0
+
+        await asyncio.sleep(0.6)
+
+        assert len(gazpar._abandoned_fetches) == 0  # pylint: disable=W0212
+        assert len(await gazpar.async_fetch_daily_gazpar_history(date(2019, 6, 1), date(2019, 6, 30))) > 0
+
+    # ----------------------------------
+    @pytest.mark.asyncio
+    async def test_async_fetch_timeout_excludes_queue_wait(self):
+
+        # A single worker thread, busy with another task for longer than the fetch timeout
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            gazpar = Gazpar(self._grdf_device_config, self._pricing_config, self._haws, executor)
+            gazpar._fetch_timeout = 0.3  # pylint: disable=W0212
+
+            executor.submit(time.sleep, 0.5)
+
+            daily_history = await gazpar.async_fetch_daily_gazpar_history(date(2019, 6, 1), date(2019, 6, 30))
+
+            assert len(daily_history) > 0
+
+    # ----------------------------------
+    def test_transform(self):
+
+        gazpar = Gazpar(self._grdf_device_config, self._pricing_config, self._haws)
+
+        daily_history = gazpar.fetch_daily_gazpar_history(date(2019, 6, 1), date(2019, 6, 30))
+
+        sensor_names = gazpar._sensor_names()  # pylint: disable=protected-access
+        readings = GazparReadings(
+            end_date=daily_history.last_date(),
+            daily_history=daily_history,
+            last_date_and_value_by_sensor={
+                sensor_name: (date(2019, 6, 1), 100.0 * (index + 1)) for index, sensor_name in enumerate(sensor_names)
+            },
+        )
+
+        publications = gazpar.transform(readings)
+
+        assert [publication.entity_id for publication in publications] == sensor_names[:2] + sensor_names[3:] + [
+            sensor_names[2]
+        ]
+
+        # The sums continue from the last sums known by Home Assistant
+        for index, sensor_name in enumerate(sensor_names):
+            publication = next(publication for publication in publications if publication.entity_id == sensor_name)
+            assert publication.sum_array.start_date == date(2019, 6, 2)
+            assert publication.sum_array[date(2019, 6, 2)] >= 100.0 * (index + 1)
+
+        # The sums of all the costs are rows of the same buffer
+        cost_publications = publications[2:]
+        assert cost_publications[0].sum_array.array.base is not None  # type: ignore[union-attr]
+        for publication in cost_publications[1:]:
+            assert publication.sum_array.array.base is cost_publications[0].sum_array.array.base  # type: ignore[union-attr]
+
+    # ----------------------------------
+    def test_is_publication_expected(self):
+
+        gazpar = Gazpar(self._grdf_device_config, self._pricing_config, self._haws)
+
+        # Readings found two days after their date: the reading of today is not expected before the day after tomorrow
+        today = date.today()
+        for days in range(2, 4):
+            gazpar._publication_gate.record(  # type: ignore[union-attr] # pylint: disable=W0212
+                today - timedelta(days=days + 1),
+                today - timedelta(days=days),
+                datetime.combine(today, datetime.min.time()),
+            )
+
+        # A fixed as_of_date always fetches
+        assert gazpar._is_publication_expected(today - timedelta(days=1))  # pylint: disable=W0212
+
+        gazpar._as_of_date = None  # pylint: disable=W0212
+
+        assert not gazpar._is_publication_expected(today - timedelta(days=1))  # pylint: disable=W0212
+        assert gazpar._is_publication_expected(today - timedelta(days=3))  # pylint: disable=W0212
+
     # ----------------------------------
     @pytest.mark.asyncio
     async def test_find_last_date_and_value(self):
@@ -80,6 +233,26 @@ class TestGazpar:
 
         await self._haws.disconnect()
 
+    # ----------------------------------
+    @pytest.mark.asyncio
+    async def test_find_last_dates_and_values(self):
+
+        gazpar = Gazpar(self._grdf_device_config, self._pricing_config, self._haws)
+
+        await self._haws.connect()
+
+        entity_ids = ["sensor.gazpar2haws_volume", "sensor.gazpar2haws_energy", "sensor.gazpar2haws_test"]
+
+        last_date_and_value_by_entity = await gazpar.find_last_dates_and_values(entity_ids)
+
+        assert set(last_date_and_value_by_entity.keys()) == set(entity_ids)
+
+        for last_date, last_value in last_date_and_value_by_entity.values():
+            assert last_date is not None
+            assert last_value is not None
+
+        await self._haws.disconnect()
+
     # ----------------------------------
     @pytest.mark.asyncio
     async def test_push_energy_date_array(self):
@@ -103,6 +276,50 @@ class TestGazpar:
 
         await self._haws.disconnect()
 
+    # ----------------------------------
+    @pytest.mark.asyncio
+    async def test_repair_date_array(self):
+
+        gazpar = Gazpar(self._grdf_device_config, self._pricing_config, self._haws)
+
+        await self._haws.connect()
+
+        entity_id = "sensor.gazpar2haws_repair_test"
+
+        await self._haws.clear_statistics([entity_id])
+
+        start_date = date(2019, 6, 1)
+        end_date = date(2019, 6, 30)
+
+        daily_history = gazpar.fetch_daily_gazpar_history(start_date, end_date)
+
+        energy_array = gazpar.extract_property_from_daily_gazpar_history(
+            daily_history, pygazpar.PropertyName.ENERGY.value, start_date, end_date
+        )
+
+        await gazpar.publish_date_array(entity_id, "gazpar2haws_repair_test", "energy", "kWh", energy_array, 0)
+
+        # Nothing to repair
+        assert await gazpar.repair_date_array(entity_id, "kWh", energy_array) == 0
+
+        # Corrupt the sums from two dates
+        tz = pytz.timezone("Europe/Paris")
+        await self._haws.adjust_sum_statistics(entity_id, tz.localize(datetime(2019, 6, 10)), 100.0, "kWh")
+        await self._haws.adjust_sum_statistics(entity_id, tz.localize(datetime(2019, 6, 20)), -30.0, "kWh")
+
+        assert await gazpar.repair_date_array(entity_id, "kWh", energy_array) == 2
+
+        statistics = await self._haws.statistics_during_period(
+            [entity_id], tz.localize(datetime(2019, 6, 1)), tz.localize(datetime(2019, 7, 1)), ["sum"]
+        )
+        sums = [statistic["sum"] for statistic in statistics[entity_id]]
+        assert sums == pytest.approx(list(energy_array.cumsum().array))
+
+        # Clean up
+        await self._haws.clear_statistics([entity_id])
+
+        await self._haws.disconnect()
+
     # ----------------------------------
     @pytest.mark.asyncio
     async def test_push_cost_date_array(self):
@@ -1,18 +1,26 @@
 """Test haws module."""
 
 import asyncio
-from datetime import datetime
+import json
+from datetime import datetime, timezone
 
 import pytest
 
 from gazpar2haws import config_utils
-from gazpar2haws.haws import HomeAssistantWS
+from gazpar2haws.haws import (
+    HomeAssistantWS,
+    HomeAssistantWSConnectionClosed,
+    HomeAssistantWSException,
+    ImportChunkSizer,
+    StatisticIdRegistry,
+)
+from gazpar2haws.statistics_outbox import SensorStatistics
 
 # See WebSocket source code here: https://git.informatik.uni-kl.de/s_menne19/hassio-core/-/blob/fix-tests-assist/homeassistant/components/recorder/websocket_api.py
 
 
 # ----------------------------------
-class TestHomeAssistantWS:
+class TestHomeAssistantWS:  # pylint: disable=too-many-public-methods
 
     # ----------------------------------
     def setup_method(self):
@@ -46,6 +54,81 @@ class TestHomeAssistantWS:
 
         await self._haws.disconnect()
 
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_ensure_connected(self):
+
+        # Not connected yet: a connection is established.
+        await self._haws.ensure_connected()
+
+        assert self._haws.is_connected()
+        assert await self._haws.ping()
+
+        # Already connected: the connection is kept.
+        await self._haws.ensure_connected()
+
+        assert self._haws.is_connected()
+
+        await self._haws.disconnect()
+
+        assert not self._haws.is_connected()
+
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_reconnect_on_connection_lost(self):
+
+        await self._haws.connect()
+
+        # Simulate a connection drop (e.g. Home Assistant restart).
+        await self._haws._websocket.close()  # pylint: disable=protected-access
+
+        # The request transparently reconnects.
+        statistics = await self._haws.list_statistic_ids("sum")
+
+        assert statistics is not None
+
+        await self._haws.disconnect()
+
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_resend_only_with_retry(self):
+
+        await self._haws.connect()
+
+        sent_messages = list[dict]()
+        request = self._haws._request  # pylint: disable=protected-access
+
+        # The connection is lost while the first request is in flight (Home Assistant may have applied it).
+        async def dropping_request(message: dict):
+            if message["type"] == "ping":
+                return await request(message)
+            sent_messages.append(message)
+            if len(sent_messages) == 1:
+                raise HomeAssistantWSConnectionClosed("Connection to Home Assistant closed")
+            return await request(message)
+
+        self._haws._request = dropping_request  # type: ignore[method-assign] # pylint: disable=protected-access
+
+        # Not idempotent: the error is raised and the message is not sent again.
+        with pytest.raises(HomeAssistantWSConnectionClosed):
+            await self._haws.send_message({"type": "recorder/list_statistic_ids", "statistic_type": "sum"})
+
+        assert len(sent_messages) == 1
+
+        # Idempotent: the message is sent again after reconnecting.
+        sent_messages.clear()
+        response = await self._haws.send_message(
+            {"type": "recorder/list_statistic_ids", "statistic_type": "sum"}, retry=True
+        )
+
+        assert isinstance(response, list)
+        assert len(sent_messages) == 2
+
+        await self._haws.disconnect()
+
     # ----------------------------------
     # @pytest.mark.skip(reason="Requires Home Assistant server")
     @pytest.mark.asyncio
@@ -59,6 +142,23 @@ class TestHomeAssistantWS:
 
         await self._haws.disconnect()
 
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_send_messages(self):
+
+        await self._haws.connect()
+
+        # Several requests in flight at the same time on the same connection.
+        responses = await self._haws.send_messages(
+            [{"type": "recorder/list_statistic_ids", "statistic_type": "sum"} for _ in range(5)]
+        )
+
+        assert len(responses) == 5
+        assert all(isinstance(response, list) for response in responses)
+
+        await self._haws.disconnect()
+
     # ----------------------------------
     # @pytest.mark.skip(reason="Requires Home Assistant server")
     @pytest.mark.asyncio
@@ -72,6 +172,57 @@ class TestHomeAssistantWS:
 
         await self._haws.disconnect()
 
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_exists_statistic_id_after_import_and_clear(self):
+
+        await self._haws.connect()
+
+        statistics = [{"start": "2020-12-14T00:00:00+00:00", "state": 100.0, "sum": 100.0}]
+
+        await self._haws.import_statistics(
+            "sensor.gazpar2haws_registry_test", "recorder", "test", "volume", "m³", statistics
+        )
+
+        assert await self._haws.exists_statistic_id("sensor.gazpar2haws_registry_test", "sum")
+
+        await self._haws.clear_statistics(["sensor.gazpar2haws_registry_test"])
+
+        assert not await self._haws.exists_statistic_id("sensor.gazpar2haws_registry_test", "sum")
+
+        await self._haws.disconnect()
+
+    # ----------------------------------
+    def test_statistic_id_registry(self):
+
+        registry = StatisticIdRegistry(ttl=60)
+
+        assert registry.get("sum") is None
+
+        registry.load("sum", {"sensor.a"})
+        registry.load(None, {"sensor.a", "sensor.b"})
+
+        registry.add("sensor.c", ["sum"])
+
+        assert registry.get("sum") == {"sensor.a", "sensor.c"}
+        assert registry.get(None) == {"sensor.a", "sensor.b", "sensor.c"}
+
+        registry.discard(["sensor.a"])
+
+        assert registry.get("sum") == {"sensor.c"}
+        assert registry.get(None) == {"sensor.b", "sensor.c"}
+
+        registry.invalidate()
+
+        assert registry.get("sum") is None
+
+        # Expired entries are not returned.
+        expired_registry = StatisticIdRegistry(ttl=-1)
+        expired_registry.load("sum", {"sensor.a"})
+
+        assert expired_registry.get("sum") is None
+
     # ----------------------------------
     # @pytest.mark.skip(reason="Requires Home Assistant server")
     @pytest.mark.asyncio
@@ -85,6 +236,50 @@ class TestHomeAssistantWS:
 
         await self._haws.disconnect()
 
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_get_last_statistics(self):
+
+        await self._haws.connect()
+
+        statistics = [
+            {"start": "2020-12-14T00:00:00+00:00", "state": 100.0, "sum": 100.0},
+            {"start": "2020-12-15T00:00:00+00:00", "state": 200.0, "sum": 200.0},
+        ]
+
+        await self._haws.import_statistics(
+            "sensor.gazpar2haws_last_statistics_test", "recorder", "test", "volume", "m³", statistics
+        )
+
+        last_statistics = await self._haws.get_last_statistics(
+            ["sensor.gazpar2haws_last_statistics_test", "sensor.gazpar2haws_nonexistent"],
+            datetime(2020, 12, 31, tzinfo=timezone.utc),
+            30,
+        )
+
+        assert last_statistics["sensor.gazpar2haws_last_statistics_test"]["sum"] == 200.0
+        assert "sensor.gazpar2haws_nonexistent" not in last_statistics
+
+        # Last statistic far before the as of date: found by widening the probe window.
+        last_statistics = await self._haws.get_last_statistics(
+            ["sensor.gazpar2haws_last_statistics_test"], datetime(2021, 6, 30, tzinfo=timezone.utc), 365
+        )
+
+        assert last_statistics["sensor.gazpar2haws_last_statistics_test"]["sum"] == 200.0
+
+        # Last statistic before the depth: not found.
+        last_statistics = await self._haws.get_last_statistics(
+            ["sensor.gazpar2haws_last_statistics_test"], datetime(2021, 6, 30, tzinfo=timezone.utc), 100
+        )
+
+        assert "sensor.gazpar2haws_last_statistics_test" not in last_statistics
+
+        # Clean up
+        await self._haws.clear_statistics(["sensor.gazpar2haws_last_statistics_test"])
+
+        await self._haws.disconnect()
+
     # ----------------------------------
     # @pytest.mark.skip(reason="Requires Home Assistant server")
     @pytest.mark.asyncio
@@ -102,6 +297,173 @@ class TestHomeAssistantWS:
 
         await self._haws.disconnect()
 
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_import_statistics_in_chunks(self):
+
+        await self._haws.connect()
+
+        # More rows than the initial chunk size.
+        statistics = [
+            {"start": f"2021-{month:02d}-{day:02d}T00:00:00+00:00", "state": 1.0 * day, "sum": 1.0 * day}
+            for month in range(1, 13)
+            for day in range(1, 29)
+        ] * 2
+
+        await self._haws.import_statistics(
+            "sensor.gazpar2haws_chunk_test", "recorder", "test", "volume", "m³", statistics
+        )
+
+        assert await self._haws.exists_statistic_id("sensor.gazpar2haws_chunk_test", "sum")
+
+        await self._haws.clear_statistics(["sensor.gazpar2haws_chunk_test"])
+
+        await self._haws.disconnect()
+
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_import_statistics_with_outbox(self, tmp_path):
+
+        haws = HomeAssistantWS(
+            self._config.get("homeassistant.host"),
+            self._config.get("homeassistant.port"),
+            "/api/websocket",
+            self._config.get("homeassistant.token"),
+            outbox_file=str(tmp_path / "outbox.db"),
+        )
+
+        statistics = [
+            {"start": "2020-12-14T00:00:00+00:00", "state": 100.0, "sum": 100.0},
+            {"start": "2020-12-15T00:00:00+00:00", "state": 200.0, "sum": 200.0},
+        ]
+
+        # Home Assistant is not reachable: the batch is kept in the outbox
+        with pytest.raises(HomeAssistantWSException):
+            await haws.import_statistics(
+                "sensor.gazpar2haws_outbox_test", "recorder", "test", "volume", "m³", statistics
+            )
+
+        assert len(haws._outbox.pending()) == 1  # type: ignore[union-attr] # pylint: disable=W0212
+
+        # The batch is imported as soon as the connection is up
+        await haws.ensure_connected()
+
+        assert len(haws._outbox.pending()) == 0  # type: ignore[union-attr] # pylint: disable=W0212
+        assert await haws.exists_statistic_id("sensor.gazpar2haws_outbox_test", "sum")
+
+        await haws.clear_statistics(["sensor.gazpar2haws_outbox_test"])
+
+        await haws.disconnect()
+
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_import_sensor_statistics_with_outbox(self, tmp_path):
+
+        haws = HomeAssistantWS(
+            self._config.get("homeassistant.host"),
+            self._config.get("homeassistant.port"),
+            "/api/websocket",
+            self._config.get("homeassistant.token"),
+            outbox_file=str(tmp_path / "outbox.db"),
+        )
+
+        entity_ids = [f"sensor.gazpar2haws_outbox_test_{index}" for index in range(3)]
+        sensor_statistics = [
+            SensorStatistics(
+                entity_id=entity_id,
+                source="recorder",
+                name="test",
+                unit_class="volume",
+                unit_of_measurement="m³",
+                statistics=[{"start": "2020-12-14T00:00:00+00:00", "state": 100.0, "sum": 100.0}],
+            )
+            for entity_id in entity_ids
+        ]
+
+        await haws.connect()
+
+        imported_entity_ids = list[str]()
+        import_statistics = haws._import_statistics  # pylint: disable=protected-access
+
+        # The connection is lost while importing the second sensor.
+        async def failing_import_statistics(entity_id, *args):
+            if entity_id == entity_ids[1]:
+                raise HomeAssistantWSConnectionClosed("Connection to Home Assistant closed")
+            imported_entity_ids.append(entity_id)
+            await import_statistics(entity_id, *args)
+
+        haws._import_statistics = failing_import_statistics  # type: ignore[method-assign] # pylint: disable=W0212
+
+        with pytest.raises(HomeAssistantWSConnectionClosed):
+            await haws.import_sensor_statistics(sensor_statistics)
+
+        # The sensors not imported yet are in the outbox too.
+        assert imported_entity_ids == entity_ids[:1]
+        assert [batch.entity_id for batch in haws._outbox.pending()] == entity_ids[1:]  # type: ignore[union-attr] # pylint: disable=W0212
+
+        # A replay failing on a lost connection keeps the batches and does not raise.
+        await haws.ensure_connected()
+
+        assert [batch.entity_id for batch in haws._outbox.pending()] == entity_ids[1:]  # type: ignore[union-attr] # pylint: disable=W0212
+
+        # The batches are imported once the connection is back.
+        haws._import_statistics = import_statistics  # type: ignore[method-assign] # pylint: disable=W0212
+
+        await haws.ensure_connected()
+
+        assert len(haws._outbox.pending()) == 0  # type: ignore[union-attr] # pylint: disable=W0212
+        for entity_id in entity_ids:
+            assert await haws.exists_statistic_id(entity_id, "sum")
+
+        await haws.clear_statistics(entity_ids)
+
+        await haws.disconnect()
+
+    # ----------------------------------
+    def test_import_chunk_sizer(self):
+
+        statistics = [{"start": f"2021-01-{day:02d}T00:00:00+00:00", "state": 1.0, "sum": 1.0} for day in range(1, 31)]
+
+        # Bounded by the number of rows.
+        sizer = ImportChunkSizer(max_bytes=1024 * 1024, initial_rows=10, min_rows=5, max_rows=40, target_latency=1.0)
+
+        assert sizer.next_chunk_end(statistics, 0) == 10
+        assert sizer.next_chunk_end(statistics, 25) == 30
+
+        # Fast acknowledgement: chunks grow up to max_rows.
+        sizer.update(10, 0.1)
+        assert sizer.rows() == 20
+        sizer.update(20, 0.1)
+        sizer.update(40, 0.1)
+        assert sizer.rows() == 40
+
+        # Slow acknowledgement: chunks shrink down to min_rows.
+        sizer.update(40, 5.0)
+        assert sizer.rows() == 20
+        sizer.update(20, 5.0)
+        sizer.update(10, 5.0)
+        assert sizer.rows() == 5
+
+        # Bounded by the encoded size (but always at least one row).
+        row_bytes = len(json.dumps(statistics[0])) + 1
+        sizer = ImportChunkSizer(max_bytes=3 * row_bytes, initial_rows=10, min_rows=1, max_rows=40, target_latency=1.0)
+
+        assert sizer.next_chunk_end(statistics, 0) == 3
+
+        sizer = ImportChunkSizer(max_bytes=1, initial_rows=10, min_rows=1, max_rows=40, target_latency=1.0)
+
+        assert sizer.next_chunk_end(statistics, 0) == 1
+
+        # The row size is estimated from the largest sample row (the sums grow along the statistics).
+        statistics[9]["sum"] = 123456789.123456
+        sizer = ImportChunkSizer(max_bytes=6 * row_bytes, initial_rows=10, min_rows=1, max_rows=40, target_latency=1.0)
+
+        assert sizer.next_chunk_end(statistics, 0) == 5
+        assert sizer.next_chunk_end(statistics, 30) == 30
+
     # ----------------------------------
     # @pytest.mark.skip(reason="Requires Home Assistant server")
     @pytest.mark.asyncio
@@ -273,3 +635,121 @@ class TestHomeAssistantWS:
         )
 
         await self._haws.disconnect()
+
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_migrate_statistic_keeps_old_sensor(self):
+        """Test migration copies the statistics: the old sensor keeps its data."""
+
+        from datetime import date
+
+        import pytz
+
+        old_entity_id = "sensor.gazpar2haws_cost_copy_test"
+        new_entity_id = "sensor.gazpar2haws_total_cost_copy_test"
+        tz = pytz.timezone("Europe/Paris")
+
+        haws = self._haws
+
+        await haws.connect()
+
+        await haws.clear_statistics([old_entity_id, new_entity_id])
+
+        old_statistics = [
+            {"start": "2024-12-14T00:00:00+00:00", "state": 100.0, "sum": 100.0},
+            {"start": "2024-12-15T00:00:00+00:00", "state": 200.0, "sum": 200.0},
+        ]
+        await haws.import_statistics(old_entity_id, "recorder", "Old Cost", None, "€", old_statistics)
+
+        result = await haws.migrate_statistic(
+            old_entity_id,
+            new_entity_id,
+            "Total Cost",
+            None,
+            "€",
+            timezone="Europe/Paris",
+            as_of_date=date(2024, 12, 31),
+        )
+        assert result is True
+
+        start = tz.localize(datetime(2024, 12, 1))
+        end = tz.localize(datetime(2024, 12, 31))
+        stats = await haws.statistics_during_period([old_entity_id, new_entity_id], start, end)
+        assert [stat["sum"] for stat in stats[new_entity_id]] == [100.0, 200.0]
+        assert [stat["sum"] for stat in stats[old_entity_id]] == [100.0, 200.0]
+
+        # Clean up
+        await haws.clear_statistics([old_entity_id, new_entity_id])
+
+        await haws.disconnect()
+
+    # ----------------------------------
+    # @pytest.mark.skip(reason="Requires Home Assistant server")
+    @pytest.mark.asyncio
+    async def test_migrate_statistic_in_windows(self):
+        """Test migration streamed over several date windows, then resumed after an interruption."""
+
+        from datetime import date
+
+        import pytz
+
+        old_entity_id = "sensor.gazpar2haws_cost_window_test"
+        new_entity_id = "sensor.gazpar2haws_total_cost_window_test"
+        tz = pytz.timezone("Europe/Paris")
+
+        await self._haws.connect()
+
+        await self._haws.clear_statistics([old_entity_id, new_entity_id])
+
+        # Statistics spread over more than one migration window
+        old_statistics = [
+            {"start": "2024-03-01T00:00:00+01:00", "state": 100.0, "sum": 100.0},
+            {"start": "2024-08-01T00:00:00+02:00", "state": 200.0, "sum": 200.0},
+            {"start": "2024-12-15T00:00:00+01:00", "state": 300.0, "sum": 300.0},
+        ]
+        await self._haws.import_statistics(old_entity_id, "recorder", "Old Cost", None, "€", old_statistics)
+
+        result = await self._haws.migrate_statistic(
+            old_entity_id,
+            new_entity_id,
+            "Total Cost",
+            None,
+            "€",
+            timezone="Europe/Paris",
+            as_of_date=date(2024, 12, 31),
+        )
+        assert result is True
+
+        new_stats = await self._haws.statistics_during_period(
+            [new_entity_id], tz.localize(datetime(2024, 1, 1)), tz.localize(datetime(2024, 12, 31))
+        )
+        assert [stat["sum"] for stat in new_stats[new_entity_id]] == [100.0, 200.0, 300.0]
+
+        # Simulate a migration interrupted after the window holding the first statistic (e.g. by a restart: a new
+        # client without any state)
+        await self._haws.clear_statistics([new_entity_id])
+        await self._haws.import_statistics(new_entity_id, "recorder", "Total Cost", None, "€", old_statistics[:1])
+
+        # Resumes although the new sensor already has data (it ends before the old one), and imports the remaining
+        # windows
+        result = await self._haws.migrate_statistic(
+            old_entity_id,
+            new_entity_id,
+            "Total Cost",
+            None,
+            "€",
+            timezone="Europe/Paris",
+            as_of_date=date(2024, 12, 31),
+        )
+        assert result is True
+
+        new_stats = await self._haws.statistics_during_period(
+            [new_entity_id], tz.localize(datetime(2024, 1, 1)), tz.localize(datetime(2024, 12, 31))
+        )
+        assert [stat["sum"] for stat in new_stats[new_entity_id]] == [100.0, 200.0, 300.0]
+
+        # Clean up
+        await self._haws.clear_statistics([old_entity_id, new_entity_id])
+
+        await self._haws.disconnect()
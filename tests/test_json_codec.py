@@ -0,0 +1,49 @@
+"""Test the json_codec module."""
+
+import numpy as np
+import pytest
+
+from gazpar2haws.json_codec import JsonCodec, OrjsonCodec, get_json_codec, orjson
+
+
+# ----------------------------------
+def test_json_codec():
+
+    codec = get_json_codec("json")
+
+    assert isinstance(codec, JsonCodec)
+
+    message = {"id": 1, "type": "recorder/import_statistics", "stats": [{"sum": np.float64(1.5)}]}
+
+    encoded = codec.dumps(message)
+
+    assert codec.loads(encoded) == {"id": 1, "type": "recorder/import_statistics", "stats": [{"sum": 1.5}]}
+
+    # Websocket frames may be received as UTF-8 bytes.
+    assert codec.loads(b'{"type": "pong", "id": 2}') == {"type": "pong", "id": 2}
+
+
+# ----------------------------------
+@pytest.mark.skipif(orjson is None, reason="Requires orjson")
+def test_orjson_codec():
+
+    codec = get_json_codec("orjson")
+
+    assert isinstance(codec, OrjsonCodec)
+
+    message = {"id": 1, "type": "recorder/import_statistics", "stats": [{"sum": np.float64(1.5), "state": 2.0}]}
+
+    encoded = codec.dumps(message)
+
+    assert codec.loads(encoded) == JsonCodec().loads(JsonCodec().dumps(message))
+
+    assert codec.loads('{"type": "pong", "id": 2}') == {"type": "pong", "id": 2}
+
+
+# ----------------------------------
+def test_get_json_codec():
+
+    assert get_json_codec("auto").name == ("orjson" if orjson is not None else "json")
+
+    with pytest.raises(ValueError):
+        get_json_codec("unknown")
@@ -0,0 +1,92 @@
+"""Test the pipeline module."""
+
+import asyncio
+
+import pytest
+
+from gazpar2haws.pipeline import Pipeline, PipelineStage
+
+
+# ----------------------------------
+@pytest.mark.asyncio
+async def test_run():
+
+    async def double(value):
+        return value * 2
+
+    async def increment(value):
+        return value + 1
+
+    pipeline = Pipeline([PipelineStage("double", double, workers=2), PipelineStage("increment", increment)])
+
+    results = await pipeline.run([1, 2, 3, 4])
+
+    assert results == [3, 5, 7, 9]
+
+    double_stats, increment_stats = pipeline.stats()
+    assert double_stats.processed == 4
+    assert increment_stats.processed == 4
+    assert double_stats.failed == 0
+    assert increment_stats.max_queue_depth >= 1
+
+
+# ----------------------------------
+@pytest.mark.asyncio
+async def test_run_overlaps_stages():
+
+    events = []
+    second_download_started = asyncio.Event()
+
+    async def download(value):
+        events.append(("download started", value))
+        if value == 2:
+            second_download_started.set()
+        return value
+
+    async def upload(value):
+        # The upload of the first item only ends once the download of the second one has started (the timeout only
+        # prevents the test from hanging if the stages do not overlap).
+        if value == 1:
+            await asyncio.wait_for(second_download_started.wait(), timeout=5)
+        events.append(("upload ended", value))
+        return value
+
+    pipeline = Pipeline([PipelineStage("download", download), PipelineStage("upload", upload)])
+
+    results = await pipeline.run([1, 2, 3])
+
+    # The download of an item overlaps the upload of the previous one.
+    assert results == [1, 2, 3]
+    assert events.index(("download started", 2)) < events.index(("upload ended", 1))
+
+
+# ----------------------------------
+@pytest.mark.asyncio
+async def test_run_isolates_errors():
+
+    async def check(value):
+        if value == 2:
+            raise ValueError("Invalid value")
+        return value
+
+    async def square(value):
+        return value * value
+
+    pipeline = Pipeline([PipelineStage("check", check), PipelineStage("square", square)])
+
+    results = await pipeline.run([1, 2, 3])
+
+    assert results[0] == 1
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 9
+
+    check_stats, square_stats = pipeline.stats()
+    assert check_stats.failed == 1
+    assert square_stats.processed == 2
+
+
+# ----------------------------------
+def test_empty_pipeline():
+
+    with pytest.raises(ValueError):
+        Pipeline([])
@@ -5,6 +5,8 @@
 import math
 from datetime import date
 
+import numpy as np
+
 from gazpar2haws.configuration import Configuration
 from gazpar2haws.model import (
     CompositePriceValue,
@@ -627,6 +629,27 @@ class TestPricer:  # pylint: disable=R0904
         assert "carbon_tax" in component_costs
         assert "green_energy_levy" in component_costs
 
+    # ----------------------------------
+    def test_compute_cost_frame(self):
+        """Test the component and total costs are rows of a single date frame."""
+
+        quantities = self._create_quantities(date(2023, 8, 20), date(2023, 8, 25), 1.0, QuantityUnit.KWH)
+
+        cost_breakdown = self._pricer.compute(quantities, PriceUnit.EURO)
+
+        cost_frame = cost_breakdown.get_cost_frame()
+        assert cost_frame is not None
+        assert cost_frame.columns[-1] == "total_cost"
+        assert len(cost_frame.columns) == len(cost_breakdown.get_component_costs()) + 1
+
+        # The total row is the sum of the component rows
+        assert np.allclose(cost_frame.matrix[:-1].sum(axis=0), cost_frame.matrix[-1])
+
+        # The cost arrays are views of the date frame rows
+        assert np.shares_memory(cost_breakdown.total.value_array.array, cost_frame.matrix)
+        consumption_index = cost_frame.column_index("consumption_prices_cost")
+        assert cost_breakdown.consumption.value_array[date(2023, 8, 21)] == cost_frame.matrix[consumption_index, 1]
+
     # ----------------------------------
     def test_get_composite_price_array(self):
         """Test the new get_composite_price_array method with both quantity and time components."""
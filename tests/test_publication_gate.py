@@ -0,0 +1,48 @@
+"""Test the publication_gate module."""
+
+from datetime import date, datetime
+
+from gazpar2haws.publication_gate import PublicationGate
+
+
+# ----------------------------------
+def test_open_until_learned():
+
+    gate = PublicationGate(min_observations=2)
+
+    assert gate.expected_publication_time(date(2021, 1, 10)) is None
+    assert gate.is_open(date(2021, 1, 9), datetime(2021, 1, 10, 0, 0))
+
+    # A single observation is not enough
+    gate.record(date(2021, 1, 8), date(2021, 1, 9), datetime(2021, 1, 11, 14, 5))
+
+    assert gate.is_open(date(2021, 1, 9), datetime(2021, 1, 10, 0, 0))
+
+    # A fetch without new reading is not an observation
+    gate.record(date(2021, 1, 9), date(2021, 1, 9), datetime(2021, 1, 11, 18, 0))
+
+    assert gate.expected_publication_time(date(2021, 1, 10)) is None
+
+
+# ----------------------------------
+def test_earliest_observation():
+
+    gate = PublicationGate(min_observations=2)
+
+    # Reading of the 9th found on the 11th at 14h, reading of the 10th found on the 12th at 9h
+    gate.record(date(2021, 1, 8), date(2021, 1, 9), datetime(2021, 1, 11, 14, 5))
+    gate.record(date(2021, 1, 9), date(2021, 1, 10), datetime(2021, 1, 12, 9, 30))
+
+    assert gate.expected_publication_time(date(2021, 1, 11)) == datetime(2021, 1, 13, 9, 0)
+
+    assert not gate.is_open(date(2021, 1, 10), datetime(2021, 1, 12, 23, 0))
+    assert not gate.is_open(date(2021, 1, 10), datetime(2021, 1, 13, 8, 59))
+    assert gate.is_open(date(2021, 1, 10), datetime(2021, 1, 13, 9, 0))
+
+    # Home Assistant is late by several days: the gate is open
+    assert gate.is_open(date(2021, 1, 5), datetime(2021, 1, 12, 23, 0))
+
+    # A shorter delay wins over an earlier hour
+    gate.record(date(2021, 1, 10), date(2021, 1, 12), datetime(2021, 1, 13, 20, 0))
+
+    assert gate.expected_publication_time(date(2021, 1, 13)) == datetime(2021, 1, 14, 20, 0)
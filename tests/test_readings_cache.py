@@ -0,0 +1,92 @@
+"""Test the readings_cache module."""
+
+from datetime import date
+
+import pygazpar  # type: ignore
+
+from gazpar2haws.readings_cache import ReadingsCache
+
+TIME_PERIOD = pygazpar.PropertyName.TIME_PERIOD.value
+VOLUME = pygazpar.PropertyName.VOLUME.value
+
+
+# ----------------------------------
+def test_store_and_load(tmp_path):
+
+    cache = ReadingsCache(str(tmp_path / "readings.db"))
+
+    readings = [
+        {TIME_PERIOD: "01/01/2021", VOLUME: 1.0},
+        {TIME_PERIOD: "03/01/2021", VOLUME: 3.0},
+        {TIME_PERIOD: "10/01/2021", VOLUME: 10.0},  # Out of the stored range
+    ]
+
+    cache.store("pce1", date(2021, 1, 1), date(2021, 1, 4), readings)
+
+    known_days = cache.load("pce1", date(2021, 1, 1), date(2021, 1, 31))
+
+    # Days without reading are known as empty, up to the last reading
+    assert known_days == {
+        date(2021, 1, 1): {TIME_PERIOD: "01/01/2021", VOLUME: 1.0},
+        date(2021, 1, 2): None,
+        date(2021, 1, 3): {TIME_PERIOD: "03/01/2021", VOLUME: 3.0},
+    }
+
+    # Readings are kept per PCE, and persisted
+    assert not ReadingsCache(str(tmp_path / "readings.db")).load("pce2", date(2021, 1, 1), date(2021, 1, 31))
+    assert len(ReadingsCache(str(tmp_path / "readings.db")).load("pce1", date(2021, 1, 1), date(2021, 1, 31))) == 3
+
+
+# ----------------------------------
+def test_first_date_to_fetch(tmp_path):
+
+    cache = ReadingsCache(str(tmp_path / "readings.db"), finalization_days=7)
+
+    cache.store("pce1", date(2021, 1, 1), date(2021, 1, 4), [{TIME_PERIOD: "04/01/2021", VOLUME: 4.0}])
+
+    known_days = cache.load("pce1", date(2021, 1, 1), date(2021, 1, 31))
+
+    as_of_date = date(2021, 6, 1)
+
+    assert cache.first_date_to_fetch(known_days, date(2021, 1, 1), date(2021, 1, 4), as_of_date) is None
+    assert cache.first_date_to_fetch(known_days, date(2021, 1, 1), date(2021, 1, 10), as_of_date) == date(2021, 1, 5)
+    assert cache.first_date_to_fetch(known_days, date(2020, 12, 1), date(2021, 1, 4), as_of_date) == date(2020, 12, 1)
+
+    # Recent days (counted from the given current date) are fetched again, even if known
+    assert cache.first_date_to_fetch(known_days, date(2021, 1, 1), date(2021, 1, 4), date(2021, 1, 9)) == date(
+        2021, 1, 3
+    )
+
+
+# ----------------------------------
+def test_late_publication(tmp_path):
+
+    cache = ReadingsCache(str(tmp_path / "readings.db"), finalization_days=7)
+
+    # GrDF has not published the last two days yet
+    cache.store("pce1", date(2021, 1, 1), date(2021, 1, 4), [{TIME_PERIOD: "02/01/2021", VOLUME: 2.0}])
+
+    known_days = cache.load("pce1", date(2021, 1, 1), date(2021, 1, 4))
+
+    assert known_days == {date(2021, 1, 1): None, date(2021, 1, 2): {TIME_PERIOD: "02/01/2021", VOLUME: 2.0}}
+    assert cache.first_date_to_fetch(known_days, date(2021, 1, 1), date(2021, 1, 4), date(2021, 6, 1)) == date(
+        2021, 1, 3
+    )
+
+    # Once published, even after the finalization delay, they are fetched and recorded
+    cache.store(
+        "pce1",
+        date(2021, 1, 3),
+        date(2021, 1, 4),
+        [{TIME_PERIOD: "03/01/2021", VOLUME: 3.0}, {TIME_PERIOD: "04/01/2021", VOLUME: 4.0}],
+    )
+
+    known_days = cache.load("pce1", date(2021, 1, 1), date(2021, 1, 4))
+
+    assert known_days[date(2021, 1, 4)] == {TIME_PERIOD: "04/01/2021", VOLUME: 4.0}
+    assert cache.first_date_to_fetch(known_days, date(2021, 1, 1), date(2021, 1, 4), date(2021, 6, 1)) is None
+
+    # A range without any reading is not recorded
+    cache.store("pce1", date(2021, 2, 1), date(2021, 2, 4), [])
+
+    assert not cache.load("pce1", date(2021, 2, 1), date(2021, 2, 4))
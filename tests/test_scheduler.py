@@ -0,0 +1,75 @@
+"""Test the scheduler module."""
+
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+
+from gazpar2haws.scheduler import ScanScheduler, parse_scan_window
+
+NOW = datetime(2021, 4, 20, 10, 0, tzinfo=timezone.utc)
+
+
+# ----------------------------------
+def test_pop_due_in_order():
+
+    scheduler = ScanScheduler(timedelta(hours=8))
+
+    scheduler.schedule("b", NOW + timedelta(hours=1))
+    scheduler.schedule("a", NOW)
+    scheduler.schedule("c", NOW)
+
+    assert scheduler.next_run_time() == NOW
+    assert scheduler.pop_due(NOW) == ["a", "c"]
+    assert scheduler.pop_due(NOW) == []
+    assert scheduler.next_run_time() == NOW + timedelta(hours=1)
+
+    # A scan request makes all the devices due
+    scheduler.schedule("a", NOW + timedelta(hours=2))
+    scheduler.advance_all(NOW)
+
+    assert scheduler.pop_due(NOW) == ["b", "a"]
+
+
+# ----------------------------------
+def test_backoff_and_reset():
+
+    scheduler = ScanScheduler(timedelta(hours=8), max_interval=timedelta(hours=24))
+
+    # No new data: the interval is doubled up to the maximum
+    assert scheduler.reschedule("a", NOW, False) == NOW + timedelta(hours=16)
+    assert scheduler.reschedule("a", NOW, False) == NOW + timedelta(hours=24)
+    assert scheduler.reschedule("a", NOW, False) == NOW + timedelta(hours=24)
+
+    # An error leaves the interval unchanged
+    assert scheduler.reschedule("a", NOW, None) == NOW + timedelta(hours=24)
+
+    # The expected publication time comes first
+    assert scheduler.reschedule("a", NOW, False, NOW + timedelta(hours=3)) == NOW + timedelta(hours=3)
+
+    # New data: back to the scan interval
+    assert scheduler.reschedule("a", NOW, True) == NOW + timedelta(hours=8)
+
+
+# ----------------------------------
+def test_windows_and_jitter():
+
+    scheduler = ScanScheduler(timedelta(hours=8), windows=[parse_scan_window("06:00-12:00")])
+
+    # Inside the window
+    assert scheduler.schedule("a", NOW) == NOW
+
+    # Moved to the start of the next window
+    assert scheduler.reschedule("a", NOW, True) == datetime(2021, 4, 21, 6, 0, tzinfo=timezone.utc)
+
+    # Window spanning midnight
+    assert parse_scan_window("22:00-02:00") == (time(22, 0), time(2, 0))
+    scheduler = ScanScheduler(timedelta(hours=8), windows=[parse_scan_window("22:00-02:00")])
+    assert scheduler.schedule("a", NOW + timedelta(hours=15)) == NOW + timedelta(hours=15)
+    assert scheduler.schedule("a", NOW) == datetime(2021, 4, 20, 22, 0, tzinfo=timezone.utc)
+
+    with pytest.raises(ValueError):
+        parse_scan_window("06:00")
+
+    scheduler = ScanScheduler(timedelta(hours=8), jitter=timedelta(minutes=30))
+    run_time = scheduler.reschedule("a", NOW, True)
+    assert NOW + timedelta(hours=8) <= run_time <= NOW + timedelta(hours=8, minutes=30)
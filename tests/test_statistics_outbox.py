@@ -0,0 +1,53 @@
+"""Test the statistics_outbox module."""
+
+from gazpar2haws.statistics_outbox import SensorStatistics, StatisticsOutbox
+
+
+# ----------------------------------
+def test_add_acknowledge_pending(tmp_path):
+
+    outbox = StatisticsOutbox(str(tmp_path / "outbox.db"))
+
+    statistics = [{"start": "2021-01-01T00:00:00+01:00", "state": 1.5, "sum": 1.5}]
+
+    first_batch_id = outbox.add("sensor.volume", "recorder", "Volume", "volume", "m³", statistics)
+    second_batch_id = outbox.add("sensor.energy", "recorder", "Energy", None, "kWh", statistics)
+
+    # Batches are kept on disk, oldest first
+    batches = StatisticsOutbox(str(tmp_path / "outbox.db")).pending()
+
+    assert [batch.batch_id for batch in batches] == [first_batch_id, second_batch_id]
+    assert batches[0].entity_id == "sensor.volume"
+    assert batches[0].unit_of_measurement == "m³"
+    assert batches[1].unit_class is None
+    assert batches[1].statistics == statistics
+
+    outbox.acknowledge(first_batch_id)
+
+    assert [batch.batch_id for batch in outbox.pending()] == [second_batch_id]
+
+
+# ----------------------------------
+def test_add_many(tmp_path):
+
+    outbox = StatisticsOutbox(str(tmp_path / "outbox.db"))
+
+    statistics = [{"start": "2021-01-01T00:00:00+01:00", "state": 1.5, "sum": 1.5}]
+
+    batch_ids = outbox.add_many(
+        [
+            SensorStatistics(
+                entity_id=entity_id,
+                source="recorder",
+                name=entity_id,
+                unit_class=None,
+                unit_of_measurement="€",
+                statistics=statistics,
+            )
+            for entity_id in ["sensor.cost", "sensor.total_cost"]
+        ]
+    )
+
+    # Batches are added in order
+    assert [batch.batch_id for batch in outbox.pending()] == batch_ids
+    assert [batch.entity_id for batch in outbox.pending()] == ["sensor.cost", "sensor.total_cost"]